@@ -6,384 +6,1828 @@ Parcourt TOUS les repositories (paginés) et génère analyse-profile.json.
 Usage:
     GITHUB_TOKEN=xxx python analyse-profile.py --username rasata
     python analyse-profile.py --username rasata   # utilise gh CLI
+    python analyse-profile.py --batch users.txt --jsonl profiles.jsonl --jobs 8
+    python analyse-profile.py --org myorg --members --member-processes 4
+    python analyse-profile.py --username rasata --record run.json   # puis --replay run.json, hors-ligne
+    python analyse-profile.py --serve 8765 --batch users.txt        # service; clients: --server 8765 -u rasata
+    python analyse-profile.py --cohort profiles/ profiles.jsonl -o cohort.json
 """
 
+import abc
 import argparse
+import array
+import contextlib
+import functools
+import hashlib
+import heapq
+import inspect
 import json
 import math
+import operator
 import os
+import random
 import re
-import subprocess
+import shutil
+import sqlite3
 import sys
+import threading
+import time
 from collections import Counter, defaultdict
-from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from datetime import date, datetime, timedelta, timezone
 
 try:
-    import requests
+    import orjson  # optional, faster serializer
 except ImportError:
-    print("Module 'requests' requis: pip install requests")
-    sys.exit(1)
+    orjson = None
+
+
+# requests and numpy take longer to import than most runs need: both are
+# loaded on first use, so --help, --query and --replay never pay for them
+
+@functools.lru_cache(maxsize=None)
+def load_requests():
+    try:
+        import requests
+    except ImportError:
+        print("Module 'requests' requis: pip install requests")
+        sys.exit(1)
+    return requests
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    """numpy when installed (vectorised contribution statistics), else None."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def network_errors() -> tuple:
+    """requests' transient transport errors, or () while requests is not loaded (replay)."""
+    requests = sys.modules.get("requests")
+    return (requests.ConnectionError, requests.Timeout) if requests else ()
+
+
+# ─── Instrumentation ─────────────────────────────────────────────────────────
+
+class Tracer:
+    """Request and stage spans, exported as a Chrome trace plus a summary table.
+
+    Disabled (and nearly free) until `enabled` is set by --profile. CPU time
+    is that of the thread running the span (time.thread_time()).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.t0 = time.perf_counter()
+        self.requests = []
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, status: int, nbytes: int, start: float, end: float, cache: str):
+        if self.enabled:
+            with self._lock:
+                self.requests.append((method, url, status, nbytes, start, end, cache, threading.get_ident()))
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.spans.append((name, start, end, time.thread_time() - cpu, threading.get_ident()))
+
+    def chrome_trace(self) -> dict:
+        """Trace Event Format, loadable in chrome://tracing or Perfetto."""
+        us = lambda t: round((t - self.t0) * 1e6)  # noqa: E731
+        events = [
+            {"name": name, "cat": "stage", "ph": "X", "ts": us(start), "dur": us(end) - us(start),
+             "pid": 1, "tid": tid, "args": {"cpu_ms": round(cpu * 1000, 3)}}
+            for name, start, end, cpu, tid in self.spans
+        ] + [
+            {"name": f"{method} {url.split('?')[0]}", "cat": "http", "ph": "X", "ts": us(start),
+             "dur": us(end) - us(start), "pid": 1, "tid": tid,
+             "args": {"url": url, "status": status, "bytes": nbytes, "cache": cache}}
+            for method, url, status, nbytes, start, end, cache, tid in self.requests
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.summary()}
+
+    def summary(self) -> dict:
+        stages = {}
+        for name, start, end, cpu, _ in self.spans:
+            row = stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            row["calls"] += 1
+            row["wall_s"] += end - start
+            row["cpu_s"] += cpu
+        latencies = sorted(end - start for *_, start, end, _cache, _tid in self.requests)
+        pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)  # noqa: E731
+        return {
+            "stages": {k: {**v, "wall_s": round(v["wall_s"], 4), "cpu_s": round(v["cpu_s"], 4)} for k, v in stages.items()},
+            "requests": {
+                "count": len(self.requests),
+                "bytes": sum(r[3] for r in self.requests),
+                "by_status": dict(Counter(r[2] for r in self.requests).most_common()),
+                "by_cache": dict(Counter(r[6] for r in self.requests).most_common()),
+                "latency_ms": {"p50": pick(0.5), "p95": pick(0.95), "max": pick(1.0)} if latencies else {},
+            },
+        }
+
+    def table(self) -> str:
+        summary = self.summary()
+        lines = [f"  {'stage / function':<44} {'calls':>5} {'wall s':>9} {'cpu s':>9}"]
+        for name, row in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["wall_s"]):
+            lines.append(f"  {name:<44} {row['calls']:>5} {row['wall_s']:>9.3f} {row['cpu_s']:>9.3f}")
+        req = summary["requests"]
+        lines.append(
+            f"  {req['count']} requests, {req['bytes'] / 1024:.0f} KiB, status {req['by_status']}, "
+            f"cache {req['by_cache']}, latency {req['latency_ms']}"
+        )
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+TRACE = Tracer()
+
+
+def traced(fn):
+    """Record every call of `fn` as a span (generators: for their whole iteration)."""
+    name = fn.__qualname__
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            with TRACE.span(name):
+                yield from fn(*args, **kwargs)
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with TRACE.span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+# ─── Record / Replay ─────────────────────────────────────────────────────────
+
+def replay_key(method: str, url: str, payload: dict | None = None) -> str:
+    """Fixture key of one request: method, full URL and, for GraphQL, a hash of the body."""
+    key = f"{method} {url}"
+    if payload is not None:
+        key += " " + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+    return key
+
+
+class HeaderDict(dict):
+    """Response headers with the case-insensitive lookups of requests' CaseInsensitiveDict."""
+
+    def __init__(self, headers=()):
+        super().__init__((k.lower(), v) for k, v in dict(headers).items())
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key.lower(), value)
+
+    def __contains__(self, key):
+        return super().__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+
+class ReplayResponse:
+    """The part of requests.Response that GitHubClient uses."""
+
+    __slots__ = ("status_code", "headers", "content")
+
+    def __init__(self, status_code: int, headers, content: bytes):
+        self.status_code = status_code
+        self.headers = HeaderDict(headers)
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class RecordingSession:
+    """Wrap a session and keep every response, to be saved as a replay fixture."""
+
+    def __init__(self, session):
+        self.session = session
+        self.headers = session.headers
+        self.responses = defaultdict(list)  # replay_key -> responses, in the order they were served
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs):
+        resp = self.session.request(method, url, **kwargs)
+        entry = {"status": resp.status_code, "headers": dict(resp.headers), "body": resp.content.decode("utf-8")}
+        with self._lock:
+            self.responses[replay_key(method, url, kwargs.get("json"))].append(entry)
+        return resp
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def save(self, path: str) -> int:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"recorded_at": datetime.now(timezone.utc).isoformat(), "responses": self.responses},
+                          f, ensure_ascii=False)
+            return sum(map(len, self.responses.values()))
+
+
+class ReplaySession:
+    """Serve a recorded fixture instead of the network, optionally with simulated latency.
+
+    Repeated requests get the recorded responses in order (the last one is
+    reused once they run out); unknown requests get a 404. Recorded
+    X-RateLimit-Reset headers are dropped so that a replay never sleeps
+    on a rate limit that has long expired.
+    """
+
+    def __init__(self, path: str, latency: float = 0.0):
+        with open(path, encoding="utf-8") as f:
+            self.responses = json.load(f)["responses"]
+        self.latency = latency
+        self.headers = {}
+        self.served = Counter()
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, json: dict | None = None, **kwargs):
+        key = replay_key(method, url, json)
+        with self._lock:
+            recorded = self.responses.get(key)
+            if not recorded:
+                self.misses += 1
+            else:
+                entry = recorded[min(self.served[key], len(recorded) - 1)]
+                self.served[key] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not recorded:
+            return ReplayResponse(404, {}, b'{"message": "Not recorded"}')
+        headers = {k: v for k, v in entry["headers"].items() if k.lower() != "x-ratelimit-reset"}
+        return ReplayResponse(entry["status"], headers, entry["body"].encode("utf-8"))
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
 
 
 # ─── GitHub API Client ───────────────────────────────────────────────────────
 
+CACHE_HOME = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "analyse-profile")
+
+
+def last_page(link: str) -> int | None:
+    """Page number of the rel="last" entry of a Link header, if any."""
+    m = re.search(r'[?&]page=(\d+)[^>]*>; rel="last"', link or "")
+    return int(m.group(1)) if m else None
+
+
+class ResponseCache:
+    """Size-bounded on-disk cache of GET responses, replayed on HTTP 304.
+
+    Each entry keeps the body plus its ETag / Last-Modified validators (and
+    the Link header, needed for pagination). Entries are evicted least
+    recently used first once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._size = sum(e.stat().st_size for e in os.scandir(path) if e.name.endswith(".json"))
+
+    def _file(self, url: str) -> str:
+        return os.path.join(self.path, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def load(self, url: str) -> dict | None:
+        try:
+            with open(self._file(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def touch(self, url: str, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if hit:
+            try:
+                os.utime(self._file(url))
+            except OSError:
+                pass
+
+    def store(self, url: str, headers, body):
+        etag, modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not (etag or modified):
+            return
+        entry = json.dumps({
+            "url": url,
+            "etag": etag,
+            "last_modified": modified,
+            "link": headers.get("Link"),
+            "body": body,
+        }, ensure_ascii=False).encode()
+        target = self._file(url)
+        tmp = f"{target}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                old = os.path.getsize(target)
+            except OSError:
+                old = 0
+            with open(tmp, "wb") as f:
+                f.write(entry)
+            os.replace(tmp, target)
+            self._size += len(entry) - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is 10 % under budget."""
+        entries = sorted(
+            (e for e in os.scandir(self.path) if e.name.endswith(".json")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        budget = self.max_bytes * 0.9
+        for e in entries:
+            if self._size <= budget:
+                break
+            try:
+                size = e.stat().st_size
+                os.remove(e.path)
+                self._size -= size
+            except OSError:
+                pass
+
+
+class LanguageCache:
+    """Per-repo /languages results, reused as long as the repo's pushed_at is unchanged."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def shared(cls, path: str) -> "LanguageCache":
+        """One instance per file, so concurrent profiles (--batch) do not overwrite each other."""
+        return cls(path)
+
+    def get(self, full_name: str, pushed_at: str | None) -> dict | None:
+        entry = self.entries.get(full_name)
+        if entry and entry["pushed_at"] == pushed_at:
+            return entry["languages"]
+        return None
+
+    def put(self, full_name: str, pushed_at: str | None, languages: dict):
+        with self._lock:
+            self.entries[full_name] = {"pushed_at": pushed_at, "languages": languages}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            tmp = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+
+class AnalysisError(RuntimeError):
+    """A profile could not be analysed (unknown user, truncated pagination…)."""
+
+
+class RateLimitError(RuntimeError):
+    """The API refused service and waiting it out would exceed max_wait."""
+
+
+class RateLimiter:
+    """Client-side pacing from X-RateLimit-* / Retry-After headers.
+
+    One bucket per API resource (core, graphql…). While a bucket has plenty
+    left requests go out unthrottled; below `low_water` they are spread
+    evenly until its reset, and once it is empty callers sleep until the
+    reset — or get RateLimitError when that is more than `max_wait` away.
+    Retry-After and secondary-limit backoffs pause every thread at once.
+    """
+
+    def __init__(self, max_wait: float = 900, low_water: float = 0.1):
+        self.max_wait = max_wait
+        self.low_water = low_water
+        self.buckets = {}  # resource -> {"limit", "remaining", "reset"}
+        self._not_before = 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def update(self, resource: str, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        with self._lock:
+            self.buckets[headers.get("X-RateLimit-Resource", resource)] = {
+                "limit": int(headers.get("X-RateLimit-Limit", 0)),
+                "remaining": int(remaining),
+                "reset": float(headers.get("X-RateLimit-Reset", 0)),
+            }
+
+    def pause(self, seconds: float):
+        """Hold back every request for `seconds` (Retry-After, backoff)."""
+        if seconds > self.max_wait:
+            raise RateLimitError(f"asked to wait {seconds:.0f}s (max {self.max_wait:.0f}s)")
+        with self._lock:
+            self._not_before = max(self._not_before, time.time() + seconds)
+
+    def wait(self, resource: str, interrupted: threading.Event | None = None):
+        """Block until `resource` may be used; returns early once `interrupted` is set."""
+        with self._lock:
+            now = time.time()
+            start = max(now, self._not_before, self._next_slot.get(resource, 0.0))
+            bucket = self.buckets.get(resource)
+            if bucket and bucket["reset"] > now:
+                if bucket["remaining"] <= 0:
+                    if bucket["reset"] - now > self.max_wait:
+                        raise RateLimitError(
+                            f"{resource} rate limit exhausted until "
+                            f"{datetime.fromtimestamp(bucket['reset'], timezone.utc):%H:%M:%S} UTC"
+                        )
+                    start = max(start, bucket["reset"] + 1)
+                elif bucket["remaining"] < bucket["limit"] * self.low_water:
+                    self._next_slot[resource] = start + (bucket["reset"] - now) / bucket["remaining"]
+                bucket["remaining"] -= 1  # account for requests still in flight
+        if start > now:
+            if start - now > 5:
+                print(f"  ⏳ rate limit: waiting {start - now:.0f}s")
+            if interrupted:
+                interrupted.wait(start - now)
+            else:
+                time.sleep(start - now)
+
+    def backoff(self, attempt: int, base: float) -> float:
+        """Full-jitter exponential backoff delay for retry number `attempt`."""
+        return random.uniform(base / 2, base * 2 ** attempt)
+
+
 class GitHubClient:
     API = "https://api.github.com"
-
-    def __init__(self, token: str | None = None):
-        self.session = requests.Session()
-        self.session.headers.update({
+    MAX_RETRIES = 5
+    TIMEOUT = 30  # seconds per request, so a stalled connection is retried instead of hanging
+
+    def __init__(self, token=None, concurrency: int = 1, cache: ResponseCache | None = None,
+                 limiter: RateLimiter | None = None, pool_size: int = 10, session=None):
+        """`token` may be a callable (get_token), only called when the first request is sent.
+
+        `session` replaces the HTTP session (ReplaySession, RecordingSession…);
+        otherwise a requests session is created on first use.
+        """
+        self.concurrency = max(1, concurrency)
+        self.cache = cache
+        self.limiter = limiter or RateLimiter()
+        self.pool_size = pool_size
+        self._token = token
+        self._session = session
+        self._session_lock = threading.Lock()
+        self.rate_remaining = None
+        self.interrupted = threading.Event()  # set on Ctrl-C: in-flight stages stop at their next request
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._new_session()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def _new_session(self):
+        requests = load_requests()
+        session = requests.Session()
+        # one keep-alive pool for every thread; size it for the peak number of requests in flight
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.headers.update({
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "GitHub-Profile-Analyzer",
         })
+        token = self._token() if callable(self._token) else self._token
         if token:
-            self.session.headers["Authorization"] = f"token {token}"
-        self.rate_remaining = None
+            session.headers["Authorization"] = f"token {token}"
+        return session
+
+    @property
+    def authenticated(self) -> bool:
+        return "Authorization" in self.session.headers
 
     def get(self, url: str) -> dict | list | None:
-        resp = self.session.get(url)
-        self.rate_remaining = int(resp.headers.get("X-RateLimit-Remaining", -1))
+        return self.get_with_headers(url)[0]
+
+    def get_with_headers(self, url: str, strict: bool = False) -> tuple[dict | list | None, dict]:
+        """Like get(), but also return the response headers (Link, rate limit…).
+
+        With a cache, known pages are revalidated with If-None-Match /
+        If-Modified-Since; a 304 costs nothing against the rate limit and
+        the cached body is returned instead. With `strict`, only a 404
+        gives None: any other failure raises AnalysisError.
+        """
+        cached = self.cache.load(url) if self.cache else None
+        conditional = {}
+        if cached:
+            if cached.get("etag"):
+                conditional["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                conditional["If-Modified-Since"] = cached["last_modified"]
+        resp = self.request("GET", url, headers=conditional)
+        if resp.status_code == 304 and cached:
+            self.cache.touch(url, hit=True)
+            headers = HeaderDict(resp.headers)
+            if cached.get("link") and "Link" not in headers:
+                headers["Link"] = cached["link"]
+            return cached["body"], headers
         if resp.status_code == 200:
-            return resp.json()
+            data = resp.json()
+            if self.cache:
+                self.cache.touch(url, hit=False)
+                self.cache.store(url, resp.headers, data)
+            return data, resp.headers
+        if strict and resp.status_code != 404:
+            raise AnalysisError(f"HTTP {resp.status_code} for {url}")
         if resp.status_code == 403:
             print(f"  ⚠ Rate limit or forbidden: {url}")
         elif resp.status_code != 404:
             print(f"  ⚠ HTTP {resp.status_code}: {url}")
-        return None
-
-    def get_all_pages(self, url: str, per_page: int = 100) -> list:
+        return None, resp.headers
+
+    def get_page(self, url: str, checkpoint: "Checkpoint | None" = None) -> tuple[list | None, dict]:
+        """One page and its headers, read from / saved to `checkpoint` when given.
+
+        None only for a 404 (unknown user or org); other failures raise
+        AnalysisError, so a listing is never mistaken for an empty one.
+        """
+        if checkpoint:
+            saved = checkpoint.load("page", url)
+            if saved is not None:
+                return saved["body"], {"Link": saved["link"] or ""}
+        data, headers = self.get_with_headers(url, strict=True)
+        if checkpoint and data is not None:
+            checkpoint.save("page", url, {"body": data, "link": headers.get("Link")})
+        return data, headers
+
+    def get_all_pages(self, url: str, per_page: int = 100, checkpoint: "Checkpoint | None" = None) -> list:
         """Fetch every page until exhaustion."""
         items = []
-        page = 1
+        for page in self.iter_all_pages(url, per_page, checkpoint):
+            items.extend(page)
+        return items
+
+    def iter_all_pages(self, url: str, per_page: int = 100, checkpoint: "Checkpoint | None" = None):
+        """Yield every page, in order, as soon as it is available.
+
+        Page 1 is always fetched first; when its Link header announces the
+        last page and concurrency > 1, the remaining pages are fetched in
+        parallel through a bounded thread pool, keeping page order. With a
+        checkpoint, pages completed by an interrupted run are not requested
+        again.
+        """
+        sep = "&" if "?" in url else "?"
+        page_url = f"{url}{sep}per_page={per_page}&page={{}}".format
+
+        data, headers = self.get_page(page_url(1), checkpoint)
+        if not data:
+            return
+        yield data
+        if len(data) < per_page:
+            return
+        count = len(data)
+
+        last = last_page(headers.get("Link", ""))
+        if last and self.concurrency > 1:
+            pool = ThreadPoolExecutor(max_workers=min(self.concurrency, last - 1))
+            try:
+                # map() yields results in submission order, i.e. page order
+                fetch = lambda u: self.get_page(u, checkpoint)[0]  # noqa: E731
+                for page, data in enumerate(pool.map(fetch, map(page_url, range(2, last + 1))), 2):
+                    if data is None:
+                        raise AnalysisError(f"page {page}/{last} of {url} not found")
+                    if data:
+                        count += len(data)
+                        yield data
+                    if page % 5 == 0:
+                        print(f"    … {count} items fetched (page {page}/{last})  [rate left: {self.rate_remaining}]")
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            pool.shutdown()
+            return
+
+        for page, data in enumerate(self.iter_pages(url, per_page, start=2, checkpoint=checkpoint), 2):
+            count += len(data)
+            yield data
+            if page % 5 == 0:
+                print(f"    … {count} items fetched (page {page})  [rate left: {self.rate_remaining}]")
+
+    def iter_pages(self, url: str, per_page: int = 100, start: int = 1, checkpoint: "Checkpoint | None" = None):
+        """Yield pages one by one, sequentially, so callers can stop early.
+
+        Stops at the rel="last" page when the Link header gives one (events
+        answer 422 past it). A failed page raises AnalysisError rather than
+        cutting the listing short; only a 404 on the first page means an
+        empty listing.
+        """
         sep = "&" if "?" in url else "?"
+        page = start
         while True:
-            data = self.get(f"{url}{sep}per_page={per_page}&page={page}")
+            data, headers = self.get_page(f"{url}{sep}per_page={per_page}&page={page}", checkpoint)
+            if data is None and page > 1:
+                raise AnalysisError(f"page {page} of {url} not found")
             if not data:
-                break
-            items.extend(data)
-            if len(data) < per_page:
-                break
+                return
+            yield data
+            if len(data) < per_page or page == last_page(headers.get("Link", "")):
+                return
             page += 1
-            if page % 5 == 0:
-                print(f"    … {len(items)} items fetched (page {page})  [rate left: {self.rate_remaining}]")
-        return items
 
-    def graphql(self, query: str) -> dict | None:
-        resp = self.session.post(
-            f"{self.API}/graphql",
-            json={"query": query},
-        )
+    def request(self, method: str, url: str, **kwargs):
+        """Send one request through the rate limiter, retrying throttled or failed calls.
+
+        Primary limits wait for X-RateLimit-Reset, secondary limits honour
+        Retry-After or back off exponentially (from one minute, as GitHub
+        asks), 5xx errors, connection errors and timeouts back off from one
+        second. Raises RateLimitError (or AnalysisError when the network
+        keeps failing) rather than returning a refusal that would silently
+        truncate a scan, and AnalysisError once `interrupted` is set, so
+        that every page loop (REST or GraphQL) stops after Ctrl-C.
+        """
+        resource = "graphql" if url.endswith("/graphql") else "core"
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.limiter.wait(resource, self.interrupted)
+            if self.interrupted.is_set():
+                raise AnalysisError("interrupted")
+            start = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, timeout=self.TIMEOUT, **kwargs)
+            except network_errors() as e:
+                if attempt == self.MAX_RETRIES:
+                    raise AnalysisError(f"{method} {url} still failing after {self.MAX_RETRIES} retries: {e}") from e
+                print(f"  ⚠ {type(e).__name__}: {url} — retrying")
+                self.limiter.pause(self.limiter.backoff(attempt, 1))
+                continue
+            if TRACE.enabled:
+                conditional = not {"If-None-Match", "If-Modified-Since"}.isdisjoint(kwargs.get("headers") or {})
+                TRACE.request(method, url, resp.status_code, len(resp.content), start, time.perf_counter(),
+                              ("hit" if resp.status_code == 304 else "miss") if conditional else "-")
+            self.limiter.update(resource, resp.headers)
+            self.rate_remaining = int(resp.headers.get("X-RateLimit-Remaining", -1))
+            if attempt == self.MAX_RETRIES:
+                break
+            if resp.status_code in (403, 429):
+                retry_after = resp.headers.get("Retry-After")
+                if retry_after:
+                    self.limiter.pause(float(retry_after))
+                elif resp.headers.get("X-RateLimit-Remaining") == "0":
+                    continue  # wait() now sleeps until the reset (or raises)
+                elif "secondary rate limit" in resp.text.lower():
+                    self.limiter.pause(self.limiter.backoff(attempt, 60))
+                else:
+                    return resp  # genuinely forbidden
+            elif resp.status_code >= 500:
+                self.limiter.pause(self.limiter.backoff(attempt, 1))
+            else:
+                return resp
+        if resp.status_code in (403, 429):
+            raise RateLimitError(f"still throttled after {self.MAX_RETRIES} retries: {url}")
+        return resp
+
+    def rate_limit(self) -> dict:
+        """Current rate-limit buckets; GET /rate_limit itself is free."""
+        try:
+            resp = self.session.get(f"{self.API}/rate_limit", timeout=self.TIMEOUT)
+        except network_errors():
+            return {}
+        if resp.status_code != 200:
+            return {}
+        resources = resp.json().get("resources", {})
+        for name, b in resources.items():
+            self.limiter.update(name, {
+                "X-RateLimit-Remaining": b["remaining"],
+                "X-RateLimit-Limit": b["limit"],
+                "X-RateLimit-Reset": b["reset"],
+            })
+        return resources
+
+    def graphql(self, query: str, variables: dict | None = None) -> dict | None:
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+        resp = self.request("POST", f"{self.API}/graphql", json=payload)
         if resp.status_code == 200:
-            return resp.json().get("data")
+            body = resp.json()
+            for err in body.get("errors") or []:
+                print(f"  ⚠ GraphQL: {err.get('message')}")
+            return body.get("data")
         print(f"  ⚠ GraphQL error {resp.status_code}")
         return None
 
+    def graphql_pages(self, query: str, path: tuple[str, ...], variables: dict | None = None,
+                      checkpoint: "Checkpoint | None" = None):
+        """Yield each page of the connection at `path`, following endCursor.
+
+        The query must take a `$cursor: String` variable, pass it as `after:`
+        to the connection and select `pageInfo { hasNextPage endCursor }`;
+        a `cursor` in `variables` resumes after that point. A failed page,
+        the first one included, raises AnalysisError instead of ending the
+        scan early; only an explicitly null root (unknown login) yields
+        nothing. With a
+        checkpoint, each page is saved under its query and cursor.
+        """
+        variables = {"cursor": None, **(variables or {})}
+        digest = hashlib.sha1(query.encode()).hexdigest()
+        while True:
+            key = f"{digest} {json.dumps(variables, sort_keys=True)}"
+            conn = checkpoint.load("graphql", key) if checkpoint else None
+            if conn is None:
+                data = conn = self.graphql(query, variables)
+                for name in path:
+                    conn = (conn or {}).get(name)
+                if conn is None:
+                    if variables["cursor"] is None and data and path[0] in data and data[path[0]] is None:
+                        return  # e.g. user: null — nothing to list
+                    where = f"after cursor {variables['cursor']}" if variables["cursor"] else "on the first page"
+                    raise AnalysisError(f"GraphQL pagination of {'.'.join(path)} failed {where}")
+                if checkpoint:
+                    checkpoint.save("graphql", key, conn)
+            yield conn
+            info = conn.get("pageInfo") or {}
+            if not info.get("hasNextPage"):
+                return
+            variables["cursor"] = info["endCursor"]
+
+    def graphql_batch(self, parts: dict[str, str], size: int = 20) -> dict:
+        """Run many sub-queries as aliased fields, `size` of them per request.
+
+        `parts` maps an alias (a GraphQL name) to a top-level selection such
+        as `repository(owner: "a", name: "b") { … }`; returns alias → data.
+        """
+        out = {}
+        items = list(parts.items())
+        for i in range(0, len(items), size):
+            chunk = items[i:i + size]
+            data = self.graphql("query {\n" + "\n".join(f"  {alias}: {sel}" for alias, sel in chunk) + "\n}")
+            for alias, _ in chunk:
+                out[alias] = (data or {}).get(alias)
+        return out
+
+
+# ─── Repository Records ──────────────────────────────────────────────────────
+
+class RepoRecord:
+    """The ~20 repo fields the analysis reads, instead of the ~100-field REST payload.
+
+    Built as pages are parsed so raw dicts are dropped straight away;
+    `__slots__` avoids a per-object dict and repeated strings (language,
+    license, topics) are interned so thousands of repos share one copy.
+    `get()` keeps dict-style call sites working.
+    """
+
+    __slots__ = (
+        "id", "name", "full_name", "description", "fork", "language", "size",
+        "stargazers_count", "forks_count", "watchers_count", "open_issues_count",
+        "topics", "license", "created_at", "pushed_at", "homepage", "archived",
+        "html_url", "languages",
+    )
+
+    @classmethod
+    def from_api(cls, d) -> "RepoRecord":
+        """From a REST item, a REST-shaped GraphQL item or a to_dict() snapshot."""
+        if isinstance(d, cls):
+            return d
+        rec = cls()
+        lic = d.get("license")
+        if isinstance(lic, dict):
+            lic = lic.get("spdx_id")
+        lang = d.get("language")
+        rec.id = d.get("id")
+        rec.name = d.get("name")
+        rec.full_name = d.get("full_name")
+        rec.description = d.get("description")
+        rec.fork = bool(d.get("fork"))
+        rec.language = sys.intern(lang) if lang else None
+        rec.size = d.get("size") or 0
+        rec.stargazers_count = d.get("stargazers_count") or 0
+        rec.forks_count = d.get("forks_count") or 0
+        rec.watchers_count = d.get("watchers_count") or 0
+        rec.open_issues_count = d.get("open_issues_count") or 0
+        rec.topics = tuple(sys.intern(t) for t in d.get("topics") or ())
+        rec.license = sys.intern(lic) if lic else None
+        rec.created_at = d.get("created_at")
+        rec.pushed_at = d.get("pushed_at")
+        rec.homepage = d.get("homepage")
+        rec.archived = bool(d.get("archived"))
+        rec.html_url = d.get("html_url")
+        rec.languages = d.get("languages")
+        return rec
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def to_dict(self) -> dict:
+        return {k: v for k in self.__slots__ if (v := getattr(self, k)) is not None}
+
+
+# ─── Contribution History ────────────────────────────────────────────────────
+
+class ContributionHistory:
+    """Daily contribution counts as one array indexed by days since `start`."""
+
+    __slots__ = ("start", "counts")
+
+    def __init__(self, days: dict[str, int], end: date | None = None):
+        end = end or datetime.now(timezone.utc).date()
+        dates = [d for d in days if date.fromisoformat(d) <= end]
+        self.start = date.fromisoformat(min(dates)) if dates else end
+        self.counts = array.array("I", bytes(4 * ((end - self.start).days + 1)))
+        for d in dates:
+            self.counts[(date.fromisoformat(d) - self.start).days] = days[d]
+
+    def date_at(self, index: int) -> str:
+        return (self.start + timedelta(days=index)).isoformat()
+
+    def days(self):
+        """(ISO date, count) for every day of the history."""
+        for i, n in enumerate(self.counts):
+            yield self.date_at(i), n
+
+    def to_json(self) -> dict:
+        return {"start": self.start.isoformat(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ContributionHistory":
+        history = cls.__new__(cls)
+        history.start = date.fromisoformat(data["start"])
+        history.counts = array.array("I", data["counts"])
+        return history
+
+
+# ─── GraphQL Repository Fields ───────────────────────────────────────────────
+
+# REST field name -> (GraphQL selection, converter from a Repository node),
+# so GraphQL-fetched repos look like /users/{user}/repos items.
+REPO_GRAPHQL_FIELDS = {
+    "id": ("databaseId", lambda n: n.get("databaseId")),
+    "name": ("name", lambda n: n.get("name")),
+    "full_name": ("nameWithOwner", lambda n: n.get("nameWithOwner")),
+    "description": ("description", lambda n: n.get("description")),
+    "fork": ("isFork", lambda n: n.get("isFork", False)),
+    "language": ("primaryLanguage { name }", lambda n: (n.get("primaryLanguage") or {}).get("name")),
+    "size": ("diskUsage", lambda n: n.get("diskUsage") or 0),
+    "stargazers_count": ("stargazerCount", lambda n: n.get("stargazerCount", 0)),
+    "forks_count": ("forkCount", lambda n: n.get("forkCount", 0)),
+    # REST watchers_count is the star count, kept for compatibility
+    "watchers_count": ("stargazerCount", lambda n: n.get("stargazerCount", 0)),
+    # REST open_issues_count includes open pull requests
+    "open_issues_count": (
+        "openIssues: issues(states: OPEN) { totalCount } openPRs: pullRequests(states: OPEN) { totalCount }",
+        lambda n: (n.get("openIssues") or {}).get("totalCount", 0) + (n.get("openPRs") or {}).get("totalCount", 0),
+    ),
+    "topics": (
+        "repositoryTopics(first: 20) { nodes { topic { name } } }",
+        lambda n: [t["topic"]["name"] for t in (n.get("repositoryTopics") or {}).get("nodes", [])],
+    ),
+    "license": ("licenseInfo { spdxId }", lambda n: {"spdx_id": n["licenseInfo"]["spdxId"]} if n.get("licenseInfo") else None),
+    "created_at": ("createdAt", lambda n: n.get("createdAt")),
+    "pushed_at": ("pushedAt", lambda n: n.get("pushedAt")),
+    "homepage": ("homepageUrl", lambda n: n.get("homepageUrl") or None),
+    "archived": ("isArchived", lambda n: n.get("isArchived", False)),
+    "html_url": ("url", lambda n: n.get("url")),
+    # not in REST listings: bytes per language, largest first
+    "languages": (
+        "languages(first: 20, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }",
+        lambda n: {e["node"]["name"]: e["size"] for e in (n.get("languages") or {}).get("edges", [])},
+    ),
+}
+
+DEFAULT_GRAPHQL_FIELDS = tuple(f for f in REPO_GRAPHQL_FIELDS if f not in ("full_name", "languages"))
+
+
+def graphql_selection(fields) -> str:
+    return " ".join(dict.fromkeys(REPO_GRAPHQL_FIELDS[f][0] for f in fields))
+
+
+def from_graphql(node: dict, fields) -> dict:
+    return {f: REPO_GRAPHQL_FIELDS[f][1](node) for f in fields}
+
 
 # ─── Analyzer ─────────────────────────────────────────────────────────────────
 
 class ProfileAnalyzer:
-    def __init__(self, client: GitHubClient, username: str):
+    def __init__(self, client: GitHubClient, username: str, checkpoint: "Checkpoint | None" = None):
         self.gh = client
         self.username = username
+        self.checkpoint = checkpoint
 
     # -- basic profile ---------------------------------------------------------
+    @traced
     def fetch_user(self) -> dict:
         print("→ Fetching user profile…")
         return self.gh.get(f"{GitHubClient.API}/users/{self.username}") or {}
 
     # -- ALL repos -------------------------------------------------------------
+    @traced
     def fetch_all_repos(self) -> list[dict]:
+        return list(self.iter_repos())
+
+    @traced
+    def iter_repos(self):
+        """Yield repositories as their pages arrive."""
         print("→ Fetching ALL repositories (this may take a moment)…")
-        repos = self.gh.get_all_pages(
-            f"{GitHubClient.API}/users/{self.username}/repos?sort=pushed"
-        )
-        print(f"  ✓ {len(repos)} repositories fetched")
+        count = 0
+        for page in self.gh.iter_all_pages(f"{GitHubClient.API}/users/{self.username}/repos?sort=pushed",
+                                           checkpoint=self.checkpoint):
+            count += len(page)
+            yield from map(RepoRecord.from_api, page)
+        print(f"  ✓ {count} repositories fetched")
+
+    @traced
+    def iter_repos_graphql(self, fields=DEFAULT_GRAPHQL_FIELDS):
+        """Yield repositories through GraphQL, 100 per request, only the chosen fields.
+
+        Same repos and order as iter_repos() (public, owned, newest push first),
+        but topics, license and optionally per-language bytes come in the same
+        round-trip.
+        """
+        print("→ Fetching ALL repositories (GraphQL)…")
+        query = f"""
+        query($login: String!, $cursor: String) {{
+          user(login: $login) {{
+            repositories(first: 100, after: $cursor, ownerAffiliations: OWNER, privacy: PUBLIC,
+                         orderBy: {{field: PUSHED_AT, direction: DESC}}) {{
+              pageInfo {{ hasNextPage endCursor }}
+              nodes {{ {graphql_selection(fields)} }}
+            }}
+          }}
+        }}
+        """
+        count = 0
+        for conn in self.gh.graphql_pages(query, ("user", "repositories"), {"login": self.username}, self.checkpoint):
+            for node in conn.get("nodes") or []:
+                count += 1
+                yield RepoRecord.from_api(from_graphql(node, fields))
+        print(f"  ✓ {count} repositories fetched")
+
+    @traced
+    def fetch_repos_by_name(self, full_names: list[str], fields=DEFAULT_GRAPHQL_FIELDS) -> dict[str, dict]:
+        """Look up many repositories at once, packed as aliased sub-queries."""
+        selection = graphql_selection(fields)
+        parts = {}
+        for i, full_name in enumerate(full_names):
+            owner, name = full_name.split("/", 1)
+            parts[f"r{i}"] = f"repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {selection} }}"
+        data = self.gh.graphql_batch(parts)
+        return {
+            full_name: from_graphql(data[f"r{i}"], fields)
+            for i, full_name in enumerate(full_names) if data.get(f"r{i}")
+        }
+
+    @traced
+    def fetch_language_bytes(self, repos: list[tuple[str, str]], cache: LanguageCache | None,
+                             workers: int = 8, graphql: bool = False) -> dict[str, dict]:
+        """Bytes per language for each (full_name, pushed_at), through a capped worker pool.
+
+        Repos whose pushed_at matches the cache are not requested at all.
+        With `graphql`, repos are looked up 20 per request through
+        fetch_repos_by_name() instead of one REST call each.
+        """
+        out, todo = {}, []
+        for full_name, pushed_at in repos:
+            cached = cache.get(full_name, pushed_at) if cache else None
+            if cached is not None:
+                out[full_name] = cached
+            else:
+                todo.append((full_name, pushed_at))
+        print(f"→ Fetching languages of {len(todo)} repositories ({len(out)} cached)…")
+        try:
+            if todo:
+                with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                    if graphql:
+                        names = [full_name for full_name, _ in todo]
+
+                        def lookup(chunk):
+                            found = self.fetch_repos_by_name(chunk, ("languages",))
+                            return [found[n]["languages"] if n in found else None for n in chunk]
+
+                        chunks = pool.map(lookup, (names[i:i + 20] for i in range(0, len(names), 20)))
+                        results = (languages for chunk in chunks for languages in chunk)
+                    else:
+                        urls = (f"{GitHubClient.API}/repos/{full_name}/languages" for full_name, _ in todo)
+                        results = pool.map(self.gh.get, urls)
+                    for (full_name, pushed_at), languages in zip(todo, results):
+                        if languages is None:
+                            continue  # deleted meanwhile; retried next run
+                        out[full_name] = languages
+                        if cache:
+                            cache.put(full_name, pushed_at, languages)
+        finally:
+            # also after an interruption: the calls already made are not repeated next run
+            if cache:
+                cache.save()
+        return out
+
+    @traced
+    def fetch_repos_since(self, state: dict, public_repos: int | None) -> list[dict]:
+        """Incremental variant of fetch_all_repos() driven by pushed_at.
+
+        Pages are read newest push first and pagination stops at the first
+        repo pushed before the previous run; those changed repos replace
+        their entry in the snapshot. If the merged total disagrees with the
+        profile's public_repos (deleted, renamed or newly public repos), a
+        full scan is done instead.
+        """
+        since = state["last_run"]
+        print(f"→ Fetching repositories pushed since {since}…")
+        changed = []
+        for page in self.gh.iter_pages(f"{GitHubClient.API}/users/{self.username}/repos?sort=pushed",
+                                       checkpoint=self.checkpoint):
+            fresh = [RepoRecord.from_api(r) for r in page if (r.get("pushed_at") or "") >= since]
+            changed.extend(fresh)
+            if len(fresh) < len(page):
+                break
+        # changed repos first, then the untouched ones: same order as a full sort=pushed scan
+        seen = {r.id for r in changed}
+        repos = changed + [RepoRecord.from_api(r) for r in state["repos"] if r["id"] not in seen]
+        if public_repos is not None and len(repos) != public_repos:
+            print(f"  ⚠ {len(repos)} repos in snapshot vs {public_repos} public — falling back to a full scan")
+            return self.fetch_all_repos()
+        print(f"  ✓ {len(changed)} changed, {len(repos)} repositories in total")
         return repos
 
     # -- organisations ---------------------------------------------------------
+    @traced
     def fetch_orgs(self) -> list[dict]:
         print("→ Fetching organizations…")
-        return self.gh.get_all_pages(f"{GitHubClient.API}/users/{self.username}/orgs")
+        return self.gh.get_all_pages(f"{GitHubClient.API}/users/{self.username}/orgs", checkpoint=self.checkpoint)
 
     # -- starred (count only via Link header) ----------------------------------
+    @traced
     def fetch_starred_count(self) -> int:
-        resp = self.gh.session.get(
-            f"{GitHubClient.API}/users/{self.username}/starred?per_page=1"
-        )
+        resp = self.gh.request("GET", f"{GitHubClient.API}/users/{self.username}/starred?per_page=1")
         if resp.status_code != 200:
             return 0
-        link = resp.headers.get("Link", "")
-        m = re.search(r'page=(\d+)>; rel="last"', link)
-        return int(m.group(1)) if m else len(resp.json())
+        return last_page(resp.headers.get("Link", "")) or len(resp.json())
 
     # -- contributions (GraphQL) -----------------------------------------------
-    def fetch_contributions(self) -> dict:
+    @traced
+    def fetch_contributions(self, since: str | None = None) -> dict:
+        """Contribution totals, calendar and contributed-to repos (GraphQL).
+
+        With `since` (account creation date), every calendar year since then
+        is fetched too — packed as aliased sub-queries, 8 years per request —
+        and merged into user["contributionHistory"].
+        """
         print("→ Fetching contributions (GraphQL)…")
-        data = self.gh.graphql(f"""
-        {{
-          user(login: "{self.username}") {{
-            contributionsCollection {{
+        query = """
+        query($login: String!, $cursor: String) {
+          user(login: $login) {
+            contributionsCollection {
               totalCommitContributions
               totalPullRequestContributions
               totalPullRequestReviewContributions
               totalIssueContributions
               totalRepositoryContributions
-              contributionCalendar {{
+              contributionCalendar {
                 totalContributions
-                weeks {{
-                  contributionDays {{
+                weeks {
+                  contributionDays {
                     contributionCount
                     date
-                  }}
-                }}
-              }}
-            }}
-            repositoriesContributedTo(first: 100, contributionTypes: [COMMIT, PULL_REQUEST, ISSUE]) {{
+                  }
+                }
+              }
+            }
+            repositoriesContributedTo(first: 100, after: $cursor, contributionTypes: [COMMIT, PULL_REQUEST, ISSUE]) {
               totalCount
-              nodes {{
+              pageInfo { hasNextPage endCursor }
+              nodes {
                 nameWithOwner
                 description
                 stargazerCount
-                primaryLanguage {{ name }}
+                primaryLanguage { name }
+              }
+            }
+          }
+        }
+        """
+        data = self.gh.graphql(query, {"login": self.username})
+        if not (data and data.get("user")):
+            return {}
+        user = data["user"]
+        contributed = user.get("repositoriesContributedTo") or {}
+        if (contributed.get("pageInfo") or {}).get("hasNextPage"):
+            # later pages only need the connection; the calendar is not re-fetched
+            rest = """
+            query($login: String!, $cursor: String) {
+              user(login: $login) {
+                repositoriesContributedTo(first: 100, after: $cursor, contributionTypes: [COMMIT, PULL_REQUEST, ISSUE]) {
+                  pageInfo { hasNextPage endCursor }
+                  nodes { nameWithOwner description stargazerCount primaryLanguage { name } }
+                }
+              }
+            }
+            """
+            variables = {"login": self.username, "cursor": contributed["pageInfo"]["endCursor"]}
+            for conn in self.gh.graphql_pages(rest, ("user", "repositoriesContributedTo"), variables, self.checkpoint):
+                contributed["nodes"].extend(conn.get("nodes") or [])
+        if since:
+            user["contributionHistory"] = self.fetch_contribution_history(
+                int(since[:4]), user["contributionsCollection"]["contributionCalendar"])
+        return user
+
+    @traced
+    def fetch_contribution_history(self, first_year: int, recent_calendar: dict) -> ContributionHistory:
+        days = {}
+        this_year = datetime.now(timezone.utc).year
+        parts = {
+            f"y{year}": f"""user(login: {json.dumps(self.username)}) {{
+              contributionsCollection(from: "{year}-01-01T00:00:00Z", to: "{year}-12-31T23:59:59Z") {{
+                contributionCalendar {{ weeks {{ contributionDays {{ contributionCount date }} }} }}
               }}
-            }}
-          }}
-        }}
-        """)
-        if data and data.get("user"):
-            return data["user"]
-        return {}
+            }}"""
+            for year in range(first_year, this_year + 1)
+        }
+        years = self.gh.graphql_batch(parts, size=8)
+        missing = sorted(alias[1:] for alias, data in years.items() if data is None)
+        if missing:
+            # a hole in the history would skew streaks, per-year totals and percentiles
+            raise AnalysisError(f"contribution calendar of {', '.join(missing)} could not be fetched")
+        calendars = [recent_calendar] + [
+            (data.get("contributionsCollection") or {}).get("contributionCalendar") or {}
+            for data in years.values()
+        ]
+        for cal in calendars:
+            for w in cal.get("weeks", []):
+                for d in w.get("contributionDays", []):
+                    days[d["date"]] = d.get("contributionCount", 0)
+        history = ContributionHistory(days)
+        print(f"  ✓ {len(history.counts)} days of contributions since {history.start}")
+        return history
 
     # -- recent events ---------------------------------------------------------
-    def fetch_events(self) -> list[dict]:
+    @traced
+    def fetch_events(self, known_ids: set | None = None) -> list[dict]:
+        """Public events, newest first (GitHub keeps at most 300 / 90 days).
+
+        With `known_ids` (already stored), paging stops at the first known
+        event and only the new ones are returned.
+        """
         print("→ Fetching recent public events…")
-        return self.gh.get_all_pages(
-            f"{GitHubClient.API}/users/{self.username}/events/public",
-            per_page=100,
-        )
+        url = f"{GitHubClient.API}/users/{self.username}/events/public"
+        if not known_ids:
+            return self.gh.get_all_pages(url, per_page=100, checkpoint=self.checkpoint)
+        events = []
+        for page in self.gh.iter_pages(url, per_page=100, checkpoint=self.checkpoint):
+            fresh = [e for e in page if e.get("id") not in known_ids]
+            events.extend(fresh)
+            if len(fresh) < len(page):
+                break
+        return events
 
 
-# ─── Analysis Functions ──────────────────────────────────────────────────────
+class OrgAnalyzer:
+    """Public repositories and members of one organisation."""
 
-def analyse_repos(repos: list[dict], username: str) -> dict:
-    """Deep analysis of every repository."""
+    def __init__(self, client: GitHubClient, org: str, checkpoint: "Checkpoint | None" = None):
+        self.gh = client
+        self.org = org
+        self.checkpoint = checkpoint
+
+    @traced
+    def fetch_org(self) -> dict:
+        print("→ Fetching organization…")
+        return self.gh.get(f"{GitHubClient.API}/orgs/{self.org}") or {}
+
+    @traced
+    def iter_repos(self):
+        """Yield the organisation's public repositories as their pages arrive."""
+        print("→ Fetching ALL organization repositories…")
+        count = 0
+        for page in self.gh.iter_all_pages(f"{GitHubClient.API}/orgs/{self.org}/repos?type=public&sort=pushed",
+                                           checkpoint=self.checkpoint):
+            count += len(page)
+            yield from map(RepoRecord.from_api, page)
+        print(f"  ✓ {count} repositories fetched")
+
+    @traced
+    def fetch_members(self) -> list[dict]:
+        """Members visible to the token (the public ones unless it belongs to the org)."""
+        print("→ Fetching organization members…")
+        return self.gh.get_all_pages(f"{GitHubClient.API}/orgs/{self.org}/members", checkpoint=self.checkpoint)
+
+
+# ─── Incremental State ───────────────────────────────────────────────────────
+
+def load_state(path: str, username: str, max_age_days: float) -> dict | None:
+    """Previous snapshot for `username`, or None when missing, foreign or too old."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("username", "").lower() != username.lower() or not state.get("last_run"):
+        return None
+    taken = datetime.fromisoformat(state["last_run"].replace("Z", "+00:00"))
+    # pushed_at does not move when a dormant repo gains stars: rescan fully now and then
+    if (datetime.now(timezone.utc) - taken).total_seconds() > max_age_days * 86400:
+        print(f"  ⚠ Snapshot older than {max_age_days:g} days — full scan")
+        return None
+    return state
 
-    now = datetime.now(timezone.utc)
 
-    own = [r for r in repos if not r.get("fork")]
-    forks = [r for r in repos if r.get("fork")]
+def save_state(path: str, username: str, started_at: datetime, repos: list[RepoRecord]):
+    state = {
+        "username": username,
+        "last_run": started_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "repos": [r.to_dict() for r in repos],
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ─── Checkpoints ─────────────────────────────────────────────────────────────
+
+class Checkpoint:
+    """Completed pages and stages of one profile's run, kept on disk until it succeeds.
+
+    Every page (REST page URL or GraphQL query + cursor) and every stage
+    result is written as soon as it is complete. A run started with
+    `resume` reads them back instead of asking the API again; any other
+    run starts from an empty directory. The directory is `name` under
+    `work_dir`; a name resolving anywhere else (e.g. "..") is refused,
+    since that directory gets wiped.
+    """
+
+    def __init__(self, work_dir: str, name: str, resume: bool = False):
+        root = os.path.realpath(work_dir)
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.dirname(path) != root:
+            raise AnalysisError(f"refusing checkpoint directory {path!r} outside {root!r}")
+        self.path = path
+        self.resumed = 0
+        self._lock = threading.Lock()
+        if not resume:
+            shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, kind: str, key: str) -> str:
+        return os.path.join(self.path, f"{kind}-{hashlib.sha1(key.encode()).hexdigest()[:20]}.json")
+
+    def load(self, kind: str, key: str):
+        try:
+            with open(self._file(kind, key), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self.resumed += 1
+        return data
+
+    def save(self, kind: str, key: str, data):
+        path = self._file(kind, key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+# ─── Rate-Limit Budget ───────────────────────────────────────────────────────
+
+def estimate_requests(user: dict, per_page: int = 100, language_calls: int = 0) -> int:
+    """Upper bound of REST calls for a full run: repo pages + profile, orgs, starred, 3 event pages.
+
+    `language_calls` adds the /languages calls of --language-bytes.
+    """
+    return math.ceil((user.get("public_repos") or 0) / per_page) + 6 + language_calls
+
+
+def uncached_languages(username: str, public_repos: int, cache: LanguageCache) -> int:
+    """/languages calls a --language-bytes run may make: public repos not in the languages cache yet."""
+    prefix = f"{username.lower()}/"
+    cached = sum(1 for full_name in cache.entries if full_name.lower().startswith(prefix))
+    return max(0, public_repos - cached)
+
+
+def check_budget(client: GitHubClient, needed: int, strict: bool):
+    """Say up front whether the run fits in the remaining core budget.
+
+    With `strict` (no HTTP cache, so every call is billed) a run that cannot
+    finish before max_wait runs out raises RateLimitError immediately
+    instead of dying halfway through.
+    """
+    core = client.rate_limit().get("core")
+    if not core:
+        return
+    print(f"  ⚖ ~{needed} requests needed, {core['remaining']}/{core['limit']} left")
+    if needed <= core["remaining"]:
+        return
+    wait = core["reset"] - time.time()
+    if wait <= client.limiter.max_wait:
+        print(f"  ⚠ Budget short — requests will be paced until the reset in {wait:.0f}s")
+    elif strict:
+        raise RateLimitError(f"run needs ~{needed} requests, {core['remaining']} left until reset in {wait:.0f}s")
+    else:
+        print("  ⚠ Budget short — relying on cached (304) responses to fit")
 
-    # ── Languages ────────────────────────────────────────────────────────────
-    lang_counter = Counter()
-    lang_bytes = Counter()  # size as proxy for bytes
-    for r in own:
-        lang = r.get("language")
-        if lang:
-            lang_counter[lang] += 1
-            lang_bytes[lang] += r.get("size", 0)
 
-    fork_lang_counter = Counter()
-    for r in forks:
-        lang = r.get("language")
-        if lang:
-            fork_lang_counter[lang] += 1
+# ─── Stage Scheduler ─────────────────────────────────────────────────────────
 
-    all_lang_counter = Counter()
-    for r in repos:
-        lang = r.get("language")
-        if lang:
-            all_lang_counter[lang] += 1
-
-    # ── Stars / Forks ────────────────────────────────────────────────────────
-    total_stars = sum(r.get("stargazers_count", 0) for r in own)
-    total_forks = sum(r.get("forks_count", 0) for r in own)
-    total_watchers = sum(r.get("watchers_count", 0) for r in own)
-    total_open_issues = sum(r.get("open_issues_count", 0) for r in own)
-
-    # ── Topics ───────────────────────────────────────────────────────────────
-    topic_counter = Counter()
-    for r in repos:
-        for t in r.get("topics", []):
-            topic_counter[t] += 1
-
-    # ── Licenses ─────────────────────────────────────────────────────────────
-    license_counter = Counter()
-    for r in repos:
-        lic = (r.get("license") or {})
-        sid = lic.get("spdx_id") if isinstance(lic, dict) else lic
-        if sid and sid != "NOASSERTION":
-            license_counter[sid] += 1
-
-    # ── Timeline ─────────────────────────────────────────────────────────────
-    def parse_dt(s):
-        if not s:
-            return None
-        return datetime.fromisoformat(s.replace("Z", "+00:00"))
+def run_stages(stages: dict, max_workers: int = 6) -> tuple[dict, dict]:
+    """Run stages concurrently, each one as soon as its dependencies are done.
 
-    creation_dates = sorted(filter(None, (parse_dt(r.get("created_at")) for r in own)))
-    push_dates = sorted(filter(None, (parse_dt(r.get("pushed_at")) for r in own)))
+    `stages` maps a name to `(fn, deps)`; fn is called with the results of
+    `deps` as positional arguments. Returns `(results, timings)` with the
+    wall-clock duration of every stage in seconds. The first stage that
+    raises (or Ctrl-C) aborts the run at once: stages not yet started are
+    never submitted and running ones are not waited for.
+    """
+    results, timings = {}, {}
+    pending = dict(stages)
+    running = {}
 
-    years_active = Counter()
-    for d in creation_dates:
-        years_active[d.year] += 1
+    def timed(name, fn, args):
+        t0 = time.perf_counter()
+        try:
+            with TRACE.span(f"stage {name}"):
+                return fn(*args)
+        finally:
+            timings[name] = round(time.perf_counter() - t0, 3)
 
-    # repos created per year (all)
-    years_all = Counter()
-    for r in repos:
-        d = parse_dt(r.get("created_at"))
-        if d:
-            years_all[d.year] += 1
-
-    # ── Top own repos by stars ───────────────────────────────────────────────
-    top_starred = sorted(own, key=lambda r: r.get("stargazers_count", 0), reverse=True)[:20]
-    top_forked = sorted(own, key=lambda r: r.get("forks_count", 0), reverse=True)[:10]
-    recently_pushed = sorted(own, key=lambda r: r.get("pushed_at", ""), reverse=True)[:15]
-    largest_repos = sorted(own, key=lambda r: r.get("size", 0), reverse=True)[:10]
-
-    # ── Fork analysis — what projects interest this user ─────────────────────
-    notable_forks = sorted(forks, key=lambda r: r.get("stargazers_count", 0), reverse=True)
-
-    # Categorise forks by detected domain
-    domain_keywords = {
-        "AI / Machine Learning": [
-            "llm", "gpt", "ai", "ml", "machine-learning", "deep-learning",
-            "neural", "torch", "tensor", "whisper", "detectron", "esrgan",
-            "vlm", "openvino", "llama", "fine-tuning", "notebook", "transformer",
-        ],
-        "AI Agents": [
-            "agent", "flowise", "browser-use", "claude", "mcp", "shell-oracle",
-            "ai-shell", "claw", "council",
-        ],
-        "Cybersecurity": [
-            "security", "owasp", "pentest", "vulnerability", "cve", "phish",
-            "amass", "attack", "exploit", "sniper", "hexstrike", "dependency-check",
-        ],
-        "Document Processing": [
-            "pdf", "document", "layout", "ocr", "doclaynet", "pdfme",
-            "stirling", "watermark",
-        ],
-        "DevOps / Infrastructure": [
-            "kubernetes", "kubespray", "docker", "devpod", "coolify", "rudder",
-            "codespace", "hocus", "terraform", "ansible",
-        ],
-        "Blockchain / Web3": [
-            "blockchain", "ethereum", "ganache", "web3", "solidity",
-        ],
-        "Networking / WebRTC": [
-            "coturn", "turn", "webrtc", "proxy", "zoraxy", "gfw", "firewall",
-        ],
-        "Hardware / IoT": [
-            "arduino", "oximeter", "nfc", "hce", "cardpeek", "emv", "iot",
-        ],
-        "Frontend / UI": [
-            "react", "vue", "css", "html", "particles", "aloha", "editor",
-            "chrome-extension", "pake",
-        ],
-        "Database": [
-            "pouchdb", "alasql", "baserow", "airtable", "sql", "database",
-        ],
-    }
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or running:
+            for name, (fn, deps) in list(pending.items()):
+                if all(d in results for d in deps):
+                    del pending[name]
+                    fut = pool.submit(timed, name, fn, [results[d] for d in deps])
+                    running[fut] = name
+            if not running:
+                raise ValueError(f"Unresolvable stage dependencies: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                results[name] = fut.result()
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return results, timings
 
-    fork_domains = defaultdict(list)
-    for r in forks:
-        name_lower = (r.get("name") or "").lower()
-        desc_lower = (r.get("description") or "").lower()
-        combined = f"{name_lower} {desc_lower}"
-        matched = False
-        for domain, keywords in domain_keywords.items():
-            if any(kw in combined for kw in keywords):
-                fork_domains[domain].append({
-                    "name": r["name"],
-                    "description": (r.get("description") or "")[:120],
-                    "language": r.get("language"),
-                    "original_url": r.get("html_url"),
-                })
-                matched = True
+
+# ─── Analysis Functions ──────────────────────────────────────────────────────
+
+# Fork categorisation — first matching domain wins. Keywords match anywhere
+# ("sql" in "postgresql"); a leading "=" asks for a whole word instead, for
+# short ones that hide inside unrelated words ("ai" in "email").
+DOMAIN_KEYWORDS = {
+    "AI / Machine Learning": [
+        "llm", "gpt", "=ai", "=ml", "machine-learning", "deep-learning",
+        "neural", "torch", "tensor", "whisper", "detectron", "esrgan",
+        "vlm", "openvino", "llama", "fine-tuning", "notebook", "transformer",
+    ],
+    "AI Agents": [
+        "agent", "flowise", "browser-use", "claude", "=mcp", "shell-oracle",
+        "ai-shell", "claw", "council",
+    ],
+    "Cybersecurity": [
+        "security", "owasp", "pentest", "vulnerability", "cve", "phish",
+        "amass", "attack", "exploit", "sniper", "hexstrike", "dependency-check",
+    ],
+    "Document Processing": [
+        "pdf", "document", "layout", "=ocr", "doclaynet", "pdfme",
+        "stirling", "watermark",
+    ],
+    "DevOps / Infrastructure": [
+        "kubernetes", "kubespray", "docker", "devpod", "coolify", "rudder",
+        "codespace", "hocus", "terraform", "ansible",
+    ],
+    "Blockchain / Web3": [
+        "blockchain", "ethereum", "ganache", "web3", "solidity",
+    ],
+    "Networking / WebRTC": [
+        "coturn", "=turn", "webrtc", "proxy", "zoraxy", "gfw", "firewall",
+    ],
+    "Hardware / IoT": [
+        "arduino", "oximeter", "nfc", "=hce", "cardpeek", "=emv", "=iot",
+    ],
+    "Frontend / UI": [
+        "react", "vue", "css", "html", "particles", "aloha", "editor",
+        "chrome-extension", "pake",
+    ],
+    "Database": [
+        "pouchdb", "alasql", "baserow", "airtable", "sql", "database",
+    ],
+}
+
+
+class DomainClassifier:
+    """Fork domain matcher built once per domain table.
+
+    "-", "_" and spaces are interchangeable (the text is normalised to
+    "-" first). Keywords are plain substring tests, except "=word" ones,
+    which must sit on letter/digit edges (a plural "s" is accepted) and
+    are all found in a single regex pass. The earliest domain in the
+    table with any match wins, as with the plain substring scan.
+    """
+
+    SEPARATORS = str.maketrans("_ ", "--")
+
+    def __init__(self, table: dict[str, list[str]]):
+        self.substrings = []  # (rank, domain, keyword), by rank then longest first
+        self.words = []  # same, for "=word" keywords; regex group number - 1 -> entry
+        seen = set()
+        for rank, (domain, keywords) in enumerate(table.items()):
+            for kw in sorted((kw.strip().lower().translate(self.SEPARATORS) for kw in keywords),
+                             key=lambda kw: len(kw.lstrip("=")), reverse=True):
+                word, kw = kw.startswith("="), kw.lstrip("=")
+                if kw not in seen:
+                    seen.add(kw)
+                    (self.words if word else self.substrings).append((rank, domain, kw))
+        # a lookahead per alternative, so a word keyword starting inside another one is still seen
+        self.pattern = re.compile(
+            "(?<![a-z0-9])(?=" + "|".join(rf"({re.escape(kw)})s?(?![a-z0-9])" for _, _, kw in self.words) + ")"
+        ) if self.words else None
+
+    def classify(self, text: str) -> tuple[str, str] | None:
+        """(domain, matched keyword) for `text`, or None."""
+        text = text.lower().translate(self.SEPARATORS)
+        best = None
+        if self.pattern:
+            for m in self.pattern.finditer(text):
+                match = self.words[m.lastindex - 1]
+                if best is None or match[0] < best[0]:
+                    best = match
+        for match in self.substrings:
+            if best is not None and match[0] >= best[0]:
                 break
-        if not matched:
-            fork_domains["Other"].append({
-                "name": r["name"],
-                "description": (r.get("description") or "")[:120],
-                "language": r.get("language"),
-            })
+            if match[2] in text:
+                best = match
+                break
+        return best[1:] if best else None
 
-    # ── Archived / active ────────────────────────────────────────────────────
-    archived_count = sum(1 for r in repos if r.get("archived"))
-    has_homepage = sum(1 for r in own if r.get("homepage"))
 
-    # ── Size stats ───────────────────────────────────────────────────────────
-    sizes = [r.get("size", 0) for r in repos if r.get("size", 0) > 0]
-    total_size_kb = sum(sizes)
+@functools.lru_cache(maxsize=None)
+def load_classifier(path: str | None = None) -> DomainClassifier:
+    """Classifier for a JSON {domain: [keywords]} file, or the built-in table."""
+    if not path:
+        return DomainClassifier(DOMAIN_KEYWORDS)
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    if not (isinstance(table, dict) and table and all(
+            isinstance(kws, list) and kws and all(isinstance(k, str) and k.strip().lstrip("=").strip() for k in kws)
+            for kws in table.values())):
+        raise ValueError(f"{path}: expected a JSON object mapping domain names to non-empty keyword lists")
+    return DomainClassifier(table)
 
-    # ── Build result ─────────────────────────────────────────────────────────
-    def repo_summary(r):
-        return {
-            "name": r["name"],
-            "description": (r.get("description") or "")[:150],
-            "language": r.get("language"),
-            "stars": r.get("stargazers_count", 0),
-            "forks": r.get("forks_count", 0),
-            "size_kb": r.get("size", 0),
-            "topics": r.get("topics", []),
-            "created_at": r.get("created_at"),
-            "pushed_at": r.get("pushed_at"),
-            "homepage": r.get("homepage"),
-            "license": ((r.get("license") or {}).get("spdx_id") if isinstance(r.get("license"), dict) else r.get("license")),
-            "archived": r.get("archived", False),
-            "html_url": r.get("html_url"),
-        }
 
+def parse_dt(s):
+    if not s:
+        return None
+    return datetime.fromisoformat(s.replace("Z", "+00:00"))
+
+
+def repo_summary(r: RepoRecord) -> dict:
     return {
-        "counts": {
-            "total_repos": len(repos),
-            "own_repos": len(own),
-            "forked_repos": len(forks),
-            "archived_repos": archived_count,
-            "repos_with_homepage": has_homepage,
-            "total_stars_received": total_stars,
-            "total_forks_received": total_forks,
-            "total_watchers": total_watchers,
-            "total_open_issues": total_open_issues,
-        },
-        "languages": {
-            "own_repos_by_count": dict(lang_counter.most_common()),
-            "own_repos_by_size_kb": dict(lang_bytes.most_common()),
-            "forked_repos_by_count": dict(fork_lang_counter.most_common()),
-            "all_repos_by_count": dict(all_lang_counter.most_common()),
-            "unique_languages_count": len(all_lang_counter),
-        },
-        "topics": dict(topic_counter.most_common(50)),
-        "licenses": dict(license_counter.most_common()),
-        "timeline": {
-            "first_own_repo_created": creation_dates[0].isoformat() if creation_dates else None,
-            "latest_own_push": push_dates[-1].isoformat() if push_dates else None,
-            "own_repos_created_per_year": dict(sorted(years_active.items())),
-            "all_repos_created_per_year": dict(sorted(years_all.items())),
-        },
-        "storage": {
-            "total_size_kb": total_size_kb,
-            "total_size_mb": round(total_size_kb / 1024, 1),
-            "average_repo_size_kb": round(total_size_kb / max(len(repos), 1), 1),
-            "largest_repo_kb": max(sizes) if sizes else 0,
-        },
-        "top_own_repos_by_stars": [repo_summary(r) for r in top_starred],
-        "top_own_repos_by_forks": [repo_summary(r) for r in top_forked],
-        "recently_active_own_repos": [repo_summary(r) for r in recently_pushed],
-        "largest_own_repos": [repo_summary(r) for r in largest_repos],
-        "fork_analysis": {
-            "total_forks": len(forks),
-            "domains": {
-                domain: {
-                    "count": len(items),
-                    "repos": items[:15],  # cap for readability
-                }
-                for domain, items in sorted(fork_domains.items(), key=lambda x: -len(x[1]))
+        "name": r.name,
+        "description": (r.description or "")[:150],
+        "language": r.language,
+        "stars": r.stargazers_count,
+        "forks": r.forks_count,
+        "size_kb": r.size,
+        "topics": list(r.topics),
+        "created_at": r.created_at,
+        "pushed_at": r.pushed_at,
+        "homepage": r.homepage,
+        "license": r.license,
+        "archived": r.archived,
+        "html_url": r.html_url,
+    }
+
+
+class TopK:
+    """Bounded min-heap keeping the k largest items, ties in arrival order (like a stable sort)."""
+
+    def __init__(self, k: int, key):
+        self.k = k
+        self.key = key
+        self.heap = []
+        self.seq = 0
+
+    def add(self, item):
+        entry = (self.key(item), -self.seq, item)
+        self.seq += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def merge(self, other: "TopK"):
+        """Add `other`'s items as if they had arrived after all of ours."""
+        for key, neg_seq, item in other.heap:
+            entry = (key, neg_seq - self.seq, item)
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, entry)
+            elif entry[:2] > self.heap[0][:2]:
+                heapq.heapreplace(self.heap, entry)
+        self.seq += other.seq
+
+    def items(self) -> list:
+        return [e[2] for e in sorted(self.heap, key=lambda e: e[:2], reverse=True)]
+
+
+def pushed_at_key(r) -> str:
+    return r.pushed_at or ""
+
+
+class RepoAggregator:
+    """Single-pass accumulator behind analyse_repos().
+
+    Every repo is visited once, in any iterable (pages can be fed as they
+    arrive); top-N lists are bounded heaps and per-domain fork lists keep
+    only what the report shows, so memory follows the output size.
+    """
+
+    DOMAIN_CAP = 15  # fork repos listed per domain
+
+    def __init__(self, classifier: DomainClassifier | None = None):
+        self.classifier = classifier or load_classifier()
+        self.total = self.own = self.forks = 0
+        self.archived = self.with_homepage = 0
+        self.stars = self.forks_received = self.watchers = self.open_issues = 0
+        self.lang_counter = Counter()
+        self.lang_bytes = Counter()  # size as proxy for bytes
+        self.lang_bytes_real = None  # real bytes, once per-repo languages are known
+        self.fork_lang_counter = Counter()
+        self.all_lang_counter = Counter()
+        self.topic_counter = Counter()
+        self.license_counter = Counter()
+        self.years_active = Counter()
+        self.years_all = Counter()
+        self.first_created = None
+        self.latest_push = None
+        self.total_size_kb = 0
+        self.largest_kb = 0
+        # module-level keys: aggregators are pickled back from --org member processes
+        self.top_starred = TopK(20, operator.attrgetter("stargazers_count"))
+        self.top_forked = TopK(10, operator.attrgetter("forks_count"))
+        self.recently_pushed = TopK(15, pushed_at_key)
+        self.largest = TopK(10, operator.attrgetter("size"))
+        self.domain_counts = Counter()
+        self.domain_repos = defaultdict(list)
+
+    def update(self, repos):
+        for r in repos:
+            self.add(r)
+        return self
+
+    def add(self, r):
+        """Account for one repo (a RepoRecord or a REST dict)."""
+        r = RepoRecord.from_api(r)
+        self.total += 1
+        lang = r.language
+        if lang:
+            self.all_lang_counter[lang] += 1
+        for t in r.topics:
+            self.topic_counter[t] += 1
+        if r.license and r.license != "NOASSERTION":
+            self.license_counter[r.license] += 1
+        created = parse_dt(r.created_at)
+        if created:
+            self.years_all[created.year] += 1
+        if r.archived:
+            self.archived += 1
+        size = r.size
+        if size > 0:
+            self.total_size_kb += size
+            self.largest_kb = max(self.largest_kb, size)
+
+        if r.fork:
+            self.forks += 1
+            if lang:
+                self.fork_lang_counter[lang] += 1
+            self._classify_fork(r)
+            return
+
+        self.own += 1
+        if lang:
+            self.lang_counter[lang] += 1
+            self.lang_bytes[lang] += size
+        if isinstance(r.languages, dict):
+            self.add_languages(r.languages)
+        self.stars += r.stargazers_count
+        self.forks_received += r.forks_count
+        self.watchers += r.watchers_count
+        self.open_issues += r.open_issues_count
+        if r.homepage:
+            self.with_homepage += 1
+        if created:
+            self.years_active[created.year] += 1
+            if self.first_created is None or created < self.first_created:
+                self.first_created = created
+        pushed = parse_dt(r.pushed_at)
+        if pushed and (self.latest_push is None or pushed > self.latest_push):
+            self.latest_push = pushed
+        self.top_starred.add(r)
+        self.top_forked.add(r)
+        self.recently_pushed.add(r)
+        self.largest.add(r)
+
+    def merge(self, other: "RepoAggregator") -> "RepoAggregator":
+        """Fold in another aggregator, as if its repos had been added after ours."""
+        for name in ("total", "own", "forks", "archived", "with_homepage", "stars", "forks_received",
+                     "watchers", "open_issues", "total_size_kb"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in ("lang_counter", "lang_bytes", "fork_lang_counter", "all_lang_counter", "topic_counter",
+                     "license_counter", "years_active", "years_all"):
+            getattr(self, name).update(getattr(other, name))
+        if other.lang_bytes_real is not None:
+            self.add_languages(other.lang_bytes_real)
+        self.largest_kb = max(self.largest_kb, other.largest_kb)
+        if other.first_created and (self.first_created is None or other.first_created < self.first_created):
+            self.first_created = other.first_created
+        if other.latest_push and (self.latest_push is None or other.latest_push > self.latest_push):
+            self.latest_push = other.latest_push
+        for name in ("top_starred", "top_forked", "recently_pushed", "largest"):
+            getattr(self, name).merge(getattr(other, name))
+        for domain, count in other.domain_counts.items():
+            room = self.DOMAIN_CAP - self.domain_counts[domain]
+            if room > 0:
+                self.domain_repos[domain].extend(other.domain_repos[domain][:room])
+            self.domain_counts[domain] += count
+        return self
+
+    def add_languages(self, languages: dict):
+        """Credit one own repo's bytes per language (GitHub /languages)."""
+        if self.lang_bytes_real is None:
+            self.lang_bytes_real = Counter()
+        self.lang_bytes_real.update(languages)
+
+    def _classify_fork(self, r: RepoRecord):
+        match = self.classifier.classify(f"{r.name or ''} {r.description or ''}")
+        if match:
+            domain, keyword = match
+            self._add_to_domain(domain, {
+                "name": r.name,
+                "description": (r.description or "")[:120],
+                "language": r.language,
+                "original_url": r.html_url,
+                "matched_keyword": keyword,
+            })
+            return
+        self._add_to_domain("Other", {
+            "name": r.name,
+            "description": (r.description or "")[:120],
+            "language": r.language,
+        })
+
+    def _add_to_domain(self, domain: str, item: dict):
+        self.domain_counts[domain] += 1
+        if self.domain_counts[domain] <= self.DOMAIN_CAP:
+            self.domain_repos[domain].append(item)
+
+    @traced
+    def result(self) -> dict:
+        out = {
+            "counts": {
+                "total_repos": self.total,
+                "own_repos": self.own,
+                "forked_repos": self.forks,
+                "archived_repos": self.archived,
+                "repos_with_homepage": self.with_homepage,
+                "total_stars_received": self.stars,
+                "total_forks_received": self.forks_received,
+                "total_watchers": self.watchers,
+                "total_open_issues": self.open_issues,
             },
-        },
+            "languages": {
+                "own_repos_by_count": dict(self.lang_counter.most_common()),
+                "own_repos_by_size_kb": dict(self.lang_bytes.most_common()),
+                "forked_repos_by_count": dict(self.fork_lang_counter.most_common()),
+                "all_repos_by_count": dict(self.all_lang_counter.most_common()),
+                "unique_languages_count": len(self.all_lang_counter),
+            },
+            "topics": dict(self.topic_counter.most_common(50)),
+            "licenses": dict(self.license_counter.most_common()),
+            "timeline": {
+                "first_own_repo_created": self.first_created.isoformat() if self.first_created else None,
+                "latest_own_push": self.latest_push.isoformat() if self.latest_push else None,
+                "own_repos_created_per_year": dict(sorted(self.years_active.items())),
+                "all_repos_created_per_year": dict(sorted(self.years_all.items())),
+            },
+            "storage": {
+                "total_size_kb": self.total_size_kb,
+                "total_size_mb": round(self.total_size_kb / 1024, 1),
+                "average_repo_size_kb": round(self.total_size_kb / max(self.total, 1), 1),
+                "largest_repo_kb": self.largest_kb,
+            },
+            "top_own_repos_by_stars": [repo_summary(r) for r in self.top_starred.items()],
+            "top_own_repos_by_forks": [repo_summary(r) for r in self.top_forked.items()],
+            "recently_active_own_repos": [repo_summary(r) for r in self.recently_pushed.items()],
+            "largest_own_repos": [repo_summary(r) for r in self.largest.items()],
+            "fork_analysis": {
+                "total_forks": self.forks,
+                "domains": {
+                    domain: {
+                        "count": count,
+                        "repos": self.domain_repos[domain],  # capped for readability
+                    }
+                    # most_common() keeps first-seen order between equal counts
+                    for domain, count in self.domain_counts.most_common()
+                },
+            },
+        }
+        if self.lang_bytes_real is not None:
+            out["languages"]["own_repos_by_bytes"] = dict(self.lang_bytes_real.most_common())
+        return out
+
+
+@traced
+def analyse_repos(repos, username: str, classifier: DomainClassifier | None = None) -> dict:
+    """Deep analysis of every repository (any iterable, consumed once)."""
+    return RepoAggregator(classifier).update(repos).result()
+
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def activity_report(source, total, first, last, by_hour, by_weekday, by_month, by_repo) -> dict:
+    return {
+        "source": source,
+        "events": total,
+        "first_event": first,
+        "last_event": last,
+        "by_hour_utc": by_hour,
+        "by_weekday": dict(zip(WEEKDAYS, by_weekday)),
+        "by_month": by_month,
+        "by_repo": by_repo,
     }
 
 
-def analyse_events(events: list[dict]) -> dict:
+@traced
+def event_activity(events: list[dict]) -> dict:
+    """Hour / weekday / month / repo buckets over the fetched events only."""
+    by_hour, by_weekday = [0] * 24, [0] * 7
+    by_month, by_repo = Counter(), Counter()
+    stamps = [e["created_at"] for e in events if e.get("created_at")]
+    for e in events:
+        d = parse_dt(e.get("created_at"))
+        if d:
+            by_hour[d.hour] += 1
+            by_weekday[d.weekday()] += 1
+            by_month[e["created_at"][:7]] += 1
+            by_repo[(e.get("repo") or {}).get("name", "unknown")] += 1
+    return activity_report(
+        "recent", len(stamps), min(stamps, default=None), max(stamps, default=None),
+        by_hour, by_weekday, dict(sorted(by_month.items())), dict(by_repo.most_common(20)),
+    )
+
+
+@traced
+def analyse_events(events: list[dict], activity: dict | None = None) -> dict:
+    """Recent events summary; `activity` (stored history) replaces the recent-only series."""
     type_counter = Counter()
     repo_activity = Counter()
     for e in events:
@@ -403,34 +1847,95 @@ def analyse_events(events: list[dict]) -> dict:
             }
             for e in events[:30]
         ],
+        "activity": activity or event_activity(events),
     }
 
 
+def contribution_stats(counts) -> dict:
+    """Streaks, rolling averages and percentiles of a daily-count array (oldest first).
+
+    Vectorised with numpy when installed; the pure-Python fallback gives the
+    same numbers. The current streak tolerates an empty last day (today is
+    not over yet).
+    """
+    n = len(counts)
+    if not n:
+        return {"longest": 0, "current": 0, "busiest": None, "total": 0, "active_days": 0,
+                "rolling_average": {}, "percentiles_active_days": {}}
+    windows = {f"last_{w}_days": w for w in (7, 30, 365)}
+    np = load_numpy()
+    if np is not None:
+        c = np.frombuffer(counts, dtype=np.uint32).astype(np.int64)
+        edges = np.diff(np.concatenate(([0], (c > 0).astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        lengths = ends - starts
+        longest = int(lengths.max()) if lengths.size else 0
+        ending = ends[-1] if ends.size else -1
+        current = int(lengths[-1]) if ending == n or (ending == n - 1 and c[-1] == 0) else 0
+        active = c[c > 0]
+        pct = np.percentile(active, (50, 90, 99)).tolist() if active.size else []
+        rolling = {k: round(float(c[-w:].mean()), 2) for k, w in windows.items()}
+        busiest = int(c.argmax())
+        total, active_days = int(c.sum()), int(active.size)
+    else:
+        c = list(counts)
+        longest = streak = 0
+        for x in c:
+            streak = streak + 1 if x > 0 else 0
+            longest = max(longest, streak)
+        current = streak
+        if c[-1] == 0:
+            current = 0
+            for x in reversed(c[:-1]):
+                if x == 0:
+                    break
+                current += 1
+        active = sorted(x for x in c if x > 0)
+        # linear interpolation, as numpy.percentile
+        pct = []
+        for q in (50, 90, 99):
+            if not active:
+                break
+            pos = (len(active) - 1) * q / 100
+            lo = int(pos)
+            hi = min(lo + 1, len(active) - 1)
+            pct.append(active[lo] + (active[hi] - active[lo]) * (pos - lo))
+        rolling = {k: round(sum(c[-w:]) / min(w, n), 2) for k, w in windows.items()}
+        busiest = max(range(n), key=c.__getitem__)
+        total, active_days = sum(c), len(active)
+    return {
+        "longest": longest,
+        "current": current,
+        "busiest": busiest,
+        "total": total,
+        "active_days": active_days,
+        "rolling_average": rolling,
+        "percentiles_active_days": {f"p{q}": round(float(v), 2) for q, v in zip((50, 90, 99), pct)},
+    }
+
+
+@traced
 def analyse_contributions(contrib_data: dict) -> dict:
     cc = contrib_data.get("contributionsCollection", {})
     cal = cc.get("contributionCalendar", {})
     contrib_to = contrib_data.get("repositoriesContributedTo", {})
 
-    # longest streak from calendar
-    weeks = cal.get("weeks", [])
-    all_days = []
-    for w in weeks:
-        for d in w.get("contributionDays", []):
-            all_days.append(d)
-
-    current_streak = 0
-    longest_streak = 0
-    streak = 0
-    for d in all_days:
-        if d.get("contributionCount", 0) > 0:
-            streak += 1
-            longest_streak = max(longest_streak, streak)
-        else:
-            streak = 0
-    current_streak = streak  # streak at end of calendar
-
-    # busiest day
-    busiest = max(all_days, key=lambda d: d.get("contributionCount", 0)) if all_days else {}
+    # streaks over the whole history when available, else over the last-year calendar
+    history = contrib_data.get("contributionHistory")
+    if history is None:
+        days = {d["date"]: d.get("contributionCount", 0)
+                for w in cal.get("weeks", []) for d in w.get("contributionDays", [])}
+        history = ContributionHistory(days, end=date.fromisoformat(max(days))) if days else None
+    stats = contribution_stats(history.counts if history else [])
+    busiest_date = history.date_at(stats["busiest"]) if stats["busiest"] is not None else None
+
+    per_year = {}
+    if history:
+        last_year = (history.start + timedelta(len(history.counts) - 1)).year
+        for year in range(history.start.year, last_year + 1):
+            lo = max(0, (date(year, 1, 1) - history.start).days)
+            hi = (date(year + 1, 1, 1) - history.start).days
+            per_year[year] = sum(history.counts[lo:hi])
 
     return {
         "total_contributions_this_year": cal.get("totalContributions", 0),
@@ -450,124 +1955,1609 @@ def analyse_contributions(contrib_data: dict) -> dict:
             for n in (contrib_to.get("nodes") or [])
         ],
         "streaks": {
-            "longest_streak_days": longest_streak,
-            "current_streak_days": current_streak,
+            "longest_streak_days": stats["longest"],
+            "current_streak_days": stats["current"],
         },
         "busiest_day": {
-            "date": busiest.get("date"),
-            "contributions": busiest.get("contributionCount", 0),
+            "date": busiest_date,
+            "contributions": history.counts[stats["busiest"]] if busiest_date else 0,
+        },
+        "history": {
+            "first_day": history.start.isoformat() if history else None,
+            "days": len(history.counts) if history else 0,
+            "total_contributions": stats["total"],
+            "active_days": stats["active_days"],
+            "per_year": per_year,
+            "rolling_average": stats["rolling_average"],
+            "percentiles_active_days": stats["percentiles_active_days"],
         },
     }
 
 
-# ─── Main ─────────────────────────────────────────────────────────────────────
+# ─── Snapshot Database ───────────────────────────────────────────────────────
+
+class SnapshotDB:
+    """Append-only SQLite history of runs: repos, events, contribution days, totals.
+
+    Every run adds one `runs` row and a copy of each repo's counters, so
+    deltas between runs are indexed lookups instead of JSON diffs. Events
+    are keyed by their GitHub id and contribution days by date, so both
+    accumulate across runs without duplicates.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        generated_at TEXT NOT NULL,
+        total_repos INTEGER, own_repos INTEGER, forked_repos INTEGER,
+        stars INTEGER, forks INTEGER, followers INTEGER, contributions INTEGER,
+        aggregates TEXT
+    );
+    CREATE INDEX IF NOT EXISTS runs_user_time ON runs (username, generated_at);
+    CREATE TABLE IF NOT EXISTS repos (
+        run_id INTEGER NOT NULL REFERENCES runs (id),
+        username TEXT NOT NULL,
+        repo_id INTEGER NOT NULL,
+        name TEXT, fork INTEGER, language TEXT,
+        stars INTEGER, forks INTEGER, open_issues INTEGER, size_kb INTEGER,
+        created_at TEXT, pushed_at TEXT, archived INTEGER,
+        PRIMARY KEY (run_id, repo_id)
+    );
+    CREATE INDEX IF NOT EXISTS repos_user_repo ON repos (username, repo_id);
+    CREATE INDEX IF NOT EXISTS repos_user_created ON repos (username, created_at);
+    CREATE TABLE IF NOT EXISTS events (
+        id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        type TEXT, repo TEXT, action TEXT, created_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS events_user_time ON events (username, created_at);
+    CREATE TABLE IF NOT EXISTS contribution_days (
+        username TEXT NOT NULL,
+        date TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (username, date)
+    );
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def record_run(self, username: str, result: dict, repos, days) -> int:
+        """Store one finished run in a single transaction; returns its run id."""
+        counts = result["repositories"]["counts"]
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (username, generated_at, total_repos, own_repos, forked_repos, stars, forks,"
+                " followers, contributions, aggregates) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    username, result["_meta"]["generated_at"], counts["total_repos"], counts["own_repos"],
+                    counts["forked_repos"], counts["total_stars_received"], counts["total_forks_received"],
+                    result["profile"].get("followers"), result["contributions"]["total_contributions_this_year"],
+                    json.dumps({"counts": counts, "languages": result["repositories"]["languages"]}),
+                ),
+            )
+            run_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (run_id, username, r.id, r.name, r.fork, r.language, r.stargazers_count, r.forks_count,
+                     r.open_issues_count, r.size, r.created_at, r.pushed_at, r.archived)
+                    for r in repos
+                ),
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO contribution_days VALUES (?, ?, ?)",
+                ((username, day, count) for day, count in days),
+            )
+        return run_id
+
+    # -- events ----------------------------------------------------------------
+    def add_events(self, username: str, events: list[dict]) -> int:
+        """Store events, ignoring ids already known; returns how many were new."""
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (e["id"], username, e.get("type"), (e.get("repo") or {}).get("name"),
+                     (e.get("payload") or {}).get("action"), e.get("created_at"))
+                    for e in events if e.get("id")
+                ),
+            )
+            return self.conn.total_changes - before
+
+    def recent_event_ids(self, username: str, limit: int = 300) -> set[str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id FROM events WHERE username = ? ORDER BY created_at DESC LIMIT ?", (username, limit),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def recent_events(self, username: str, days: int = 90, limit: int = 300) -> list[dict]:
+        """Stored events in the API's own window, shaped like /events items, newest first."""
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, type, repo, action, created_at FROM events WHERE username = ? AND created_at >= ?"
+                " ORDER BY created_at DESC, CAST(id AS INTEGER) DESC LIMIT ?", (username, since, limit),
+            ).fetchall()
+        return [
+            {"id": i, "type": t, "repo": {"name": r}, "payload": {"action": a}, "created_at": c}
+            for i, t, r, a, c in rows
+        ]
+
+    def event_activity(self, username: str) -> dict:
+        """Activity series over the whole stored history, grouped inside SQLite."""
+        with self._lock:
+            q = lambda sql: self.conn.execute(sql, (username,)).fetchall()  # noqa: E731
+            total, first, last = q("SELECT COUNT(*), MIN(created_at), MAX(created_at) FROM events WHERE username = ?")[0]
+            hours = q("SELECT CAST(strftime('%H', created_at) AS INTEGER), COUNT(*) FROM events"
+                      " WHERE username = ? GROUP BY 1")
+            weekdays = q("SELECT CAST(strftime('%w', created_at) AS INTEGER), COUNT(*) FROM events"
+                         " WHERE username = ? GROUP BY 1")
+            months = q("SELECT substr(created_at, 1, 7), COUNT(*) FROM events WHERE username = ? GROUP BY 1 ORDER BY 1")
+            repos = q("SELECT repo, COUNT(*) FROM events WHERE username = ? GROUP BY repo ORDER BY 2 DESC, repo LIMIT 20")
+        by_hour, by_weekday = [0] * 24, [0] * 7
+        for h, n in hours:
+            by_hour[h] = n
+        for w, n in weekdays:
+            by_weekday[(w + 6) % 7] = n  # SQLite %w: 0 = Sunday
+        return activity_report("history", total, first, last, by_hour, by_weekday, dict(months), dict(repos))
+
+    # -- queries ---------------------------------------------------------------
+    def _runs(self, username: str, since: str | None) -> tuple[tuple | None, tuple | None]:
+        """(latest run, baseline run): the run before it, or the last one at/before `since`."""
+        latest = self.conn.execute(
+            "SELECT id, generated_at FROM runs WHERE username = ? ORDER BY generated_at DESC LIMIT 1",
+            (username,),
+        ).fetchone()
+        if not latest:
+            return None, None
+        if since:
+            base = self.conn.execute(
+                "SELECT id, generated_at FROM runs WHERE username = ? AND generated_at <= ?"
+                " ORDER BY generated_at DESC LIMIT 1", (username, since),
+            ).fetchone()
+        else:
+            base = self.conn.execute(
+                "SELECT id, generated_at FROM runs WHERE username = ? AND generated_at < ?"
+                " ORDER BY generated_at DESC LIMIT 1", (username, latest[1]),
+            ).fetchone()
+        return latest, base
+
+    def stars_delta(self, username: str, since: str | None = None, limit: int = 20) -> dict:
+        latest, base = self._runs(username, since)
+        if not latest:
+            return {}
+        if not base:
+            return {"latest_run": latest[1], "baseline_run": None, "stars_gained": None, "repos": []}
+        rows = self.conn.execute(
+            "SELECT cur.name, cur.stars, cur.stars - COALESCE(prev.stars, 0) AS gained"
+            " FROM repos cur LEFT JOIN repos prev ON prev.run_id = ? AND prev.repo_id = cur.repo_id"
+            " WHERE cur.run_id = ? AND cur.fork = 0 AND gained != 0 ORDER BY gained DESC LIMIT ?",
+            (base[0], latest[0], limit),
+        ).fetchall()
+        totals = dict(self.conn.execute("SELECT id, stars FROM runs WHERE id IN (?, ?)", (base[0], latest[0])))
+        return {
+            "latest_run": latest[1],
+            "baseline_run": base[1],
+            "stars_gained": totals[latest[0]] - totals[base[0]],
+            "repos": [{"name": n, "stars": st, "gained": g} for n, st, g in rows],
+        }
 
-def get_token() -> str | None:
-    token = os.environ.get("GITHUB_TOKEN")
-    if token:
-        return token
+    def new_repos(self, username: str, since: str, forks: bool) -> dict:
+        latest, _ = self._runs(username, None)
+        if not latest:
+            return {}
+        rows = self.conn.execute(
+            "SELECT name, language, created_at FROM repos WHERE run_id = ? AND fork = ? AND created_at >= ?"
+            " ORDER BY created_at DESC", (latest[0], int(forks), since),
+        ).fetchall()
+        return {
+            "latest_run": latest[1],
+            "since": since,
+            "count": len(rows),
+            "repos": [{"name": n, "language": lang, "created_at": c} for n, lang, c in rows],
+        }
+
+    def history(self, username: str, since: str | None = None) -> list[dict]:
+        rows = self.conn.execute(
+            "SELECT generated_at, total_repos, own_repos, forked_repos, stars, forks, followers, contributions"
+            " FROM runs WHERE username = ? AND generated_at >= ? ORDER BY generated_at",
+            (username, since or ""),
+        )
+        keys = ("generated_at", "total_repos", "own_repos", "forked_repos", "stars", "forks", "followers",
+                "contributions")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def cohort_rows(self) -> list[dict]:
+        """Latest run of every stored profile, as cohort_row() would extract it from its report."""
+        latest = self.conn.execute(
+            "SELECT r.id, r.username, r.total_repos, r.own_repos, r.forked_repos, r.stars, r.forks, r.followers,"
+            " r.contributions FROM runs r JOIN (SELECT username, MAX(generated_at) AS at FROM runs GROUP BY username) l"
+            " ON r.username = l.username AND r.generated_at = l.at ORDER BY r.username"
+        ).fetchall()
+        rows = []
+        for run_id, username, total, own, forked, stars, forks, followers, contributions in latest:
+            own_repos = "FROM repos WHERE run_id = ? AND NOT fork"
+            languages = self.conn.execute(
+                f"SELECT language, COUNT(*) {own_repos} AND language IS NOT NULL GROUP BY language", (run_id,))
+            timeline = self.conn.execute(
+                f"SELECT substr(created_at, 1, 4), COUNT(*) {own_repos} AND created_at IS NOT NULL GROUP BY 1", (run_id,))
+            top = self.conn.execute(f"SELECT MAX(stars) {own_repos}", (run_id,)).fetchone()[0]
+            rows.append({
+                "login": username,
+                "values": {"total_repos": total, "own_repos": own, "forked_repos": forked, "stars": stars,
+                           "forks_received": forks, "followers": followers, "contributions_this_year": contributions,
+                           "top_repo_stars": top},
+                "languages": dict(languages),
+                "timeline": dict(timeline),
+                "domains": None,  # fork domains are not stored per run
+            })
+        return rows
+
+
+def parse_since(value: str | None, default: str | None = None) -> str | None:
+    """'30d' / '12h' relative to now, or an ISO date; returned as an ISO timestamp."""
+    value = value or default
+    if not value:
+        return None
+    m = re.fullmatch(r"(\d+)([dh])", value)
+    if m:
+        delta = timedelta(days=int(m[1])) if m[2] == "d" else timedelta(hours=int(m[1]))
+        return (datetime.now(timezone.utc) - delta).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return value
+
+
+def run_query(db: SnapshotDB, username: str, name: str, since: str | None):
+    month_start = datetime.now(timezone.utc).strftime("%Y-%m-01T00:00:00Z")
+    if name == "stars-delta":
+        return db.stars_delta(username, parse_since(since))
+    if name == "new-forks":
+        return db.new_repos(username, parse_since(since, month_start), forks=True)
+    if name == "new-repos":
+        return db.new_repos(username, parse_since(since, month_start), forks=False)
+    return db.history(username, parse_since(since))
+
+
+QUERIES = ("stars-delta", "new-forks", "new-repos", "history")
+
+
+# ─── Cohort Analysis ─────────────────────────────────────────────────────────
+
+COHORT_VALUES = (
+    "total_repos", "own_repos", "forked_repos", "stars", "forks_received", "top_repo_stars", "followers",
+    "public_repos", "account_age_years", "contributions_this_year", "longest_streak_days",
+)
+COHORT_PERCENTILES = (10, 25, 50, 75, 90, 99)
+COHORT_DB_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def cohort_row(doc: dict) -> dict | None:
+    """What --cohort keeps of one analyse-profile.json document (None for other documents)."""
+    profile, repos = doc.get("profile"), doc.get("repositories")
+    if not (profile and repos):
+        return None
+    counts = repos["counts"]
+    contributions = doc.get("contributions") or {}
+    top = repos.get("top_own_repos_by_stars") or []
+    return {
+        "login": profile.get("login") or doc["_meta"]["username"],
+        "values": {
+            "total_repos": counts["total_repos"],
+            "own_repos": counts["own_repos"],
+            "forked_repos": counts["forked_repos"],
+            "stars": counts["total_stars_received"],
+            "forks_received": counts["total_forks_received"],
+            "top_repo_stars": top[0]["stars"] if top else 0,
+            "followers": profile.get("followers"),
+            "public_repos": profile.get("public_repos"),
+            "account_age_years": profile.get("account_age_years"),
+            "contributions_this_year": contributions.get("total_contributions_this_year"),
+            "longest_streak_days": (contributions.get("streaks") or {}).get("longest_streak_days"),
+        },
+        "languages": repos["languages"]["own_repos_by_count"],
+        "timeline": {str(y): n for y, n in repos["timeline"]["own_repos_created_per_year"].items()},
+        "domains": {d: v["count"] for d, v in repos["fork_analysis"]["domains"].items()},
+    }
+
+
+def merge_cohort_rows(old: dict, new: dict) -> dict:
+    """`new`, with what it does not know (a --db row lacks some values and
+    the fork domains) taken from an earlier row of the same login."""
+    return {
+        **new,
+        "values": {**old["values"], **{k: v for k, v in new["values"].items() if v is not None}},
+        "domains": old["domains"] if new["domains"] is None else new["domains"],
+    }
+
+
+def load_cohort_file(path: str) -> tuple[list[dict], str | None]:
+    """Rows of one report, and why it could not be read (None when it could).
+
+    A JSON report or JSONL (--batch --jsonl lines, --format jsonl records),
+    told apart by content rather than extension: a JSONL first line parses
+    on its own, the first line of an indented report does not.
+    """
+    loads = orjson.loads if orjson else json.loads
     try:
-        r = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True, timeout=10)
-        if r.returncode == 0:
-            return r.stdout.strip()
-    except (subprocess.SubprocessError, FileNotFoundError):
+        with open(path, "rb") as f:
+            first = next((line for line in f if line.strip()), b"")
+            try:
+                loads(first)
+                jsonl = True
+            except ValueError:
+                jsonl = False
+            f.seek(0)
+            docs = (loads(line) for line in f if line.strip()) if jsonl else [loads(f.read())]
+            return [row for doc in docs
+                    if isinstance(doc, dict) and doc.get("record") != "repo" and (row := cohort_row(doc))], None
+    except (OSError, ValueError, LookupError, TypeError) as e:
+        return [], f"{type(e).__name__}: {e}"
+
+
+def load_cohort(inputs: list[str], jobs: int = 4) -> list[dict]:
+    """Rows of every report under `inputs` (files or directories) and every --db history.
+
+    Report files are parsed in a process pool, each process returning only
+    the compact rows. One row per login is kept: the last input, in the
+    order given, wins, and values it lacks are filled from earlier ones.
+    Unreadable inputs are skipped with a warning.
+    """
+    sources, files = [], []  # sources: (path, is_db) in command-line order
+    for path in inputs:
+        if os.path.isdir(path):
+            found = sorted(e.path for e in os.scandir(path) if e.name.endswith((".json", ".jsonl")))
+        else:
+            found = [path]
+        for p in found:
+            is_db = p.endswith(COHORT_DB_SUFFIXES)
+            sources.append((p, is_db))
+            if not is_db:
+                files.append(p)
+    print(f"→ Loading {len(files)} reports and {len(sources) - len(files)} databases…")
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(min(jobs, len(files))) as pool:
+            loaded = list(pool.map(load_cohort_file, files, chunksize=max(1, len(files) // (jobs * 4))))
+    else:
+        loaded = list(map(load_cohort_file, files))
+    loaded = iter(loaded)
+    merged = {}
+    for path, is_db in sources:
+        if is_db:
+            rows = load_cohort_db(path)
+        else:
+            rows, error = next(loaded)
+            if error:
+                print(f"  ⚠ skipping {path}: {error}")
+        for row in rows:
+            key = row["login"].lower()
+            merged[key] = merge_cohort_rows(merged[key], row) if key in merged else row
+    return [{**row, "domains": row["domains"] or {}} for row in merged.values()]
+
+
+def load_cohort_db(path: str) -> list[dict]:
+    """SnapshotDB.cohort_rows() of one --db history ([] with a warning when unreadable)."""
+    if not os.path.isfile(path):
+        print(f"  ⚠ skipping {path}: no such database")
+        return []
+    try:
+        db = SnapshotDB(path)
+        try:
+            return db.cohort_rows()
+        finally:
+            db.close()
+    except sqlite3.Error as e:
+        print(f"  ⚠ skipping {path}: {e}")
+        return []
+
+
+class Cohort:
+    """Many profiles as columns: one float array per value (NaN when unknown)
+    and profile × key matrices of language, creation-year and fork-domain counts."""
+
+    SIMILARITY_BLOCK = 1024  # rows of the similarity matrix computed at once
+
+    def __init__(self, rows: list[dict]):
+        np = load_numpy()
+        self.logins = [r["login"] for r in rows]
+        self.values = np.array(
+            [[np.nan if r["values"].get(k) is None else r["values"][k] for k in COHORT_VALUES] for r in rows],
+            dtype=np.float64,
+        ).reshape(len(rows), len(COHORT_VALUES))
+        self.languages, self.language_names = self._matrix(rows, "languages")
+        self.timeline, self.years = self._matrix(rows, "timeline")
+        self.domains, self.domain_names = self._matrix(rows, "domains")
+
+    @staticmethod
+    def _matrix(rows: list[dict], key: str):
+        np = load_numpy()
+        names = sorted({k for r in rows for k in r[key]})
+        index = {k: i for i, k in enumerate(names)}
+        m = np.zeros((len(rows), len(names)))
+        for i, r in enumerate(rows):
+            for k, n in r[key].items():
+                m[i, index[k]] = n
+        return m, names
+
+    def aggregates(self) -> dict:
+        np = load_numpy()
+        known = ~np.isnan(self.values)
+        out = {}
+        for j, name in enumerate(COHORT_VALUES):
+            column = self.values[known[:, j], j]
+            if not column.size:
+                continue
+            pct = np.percentile(column, COHORT_PERCENTILES)
+            out[name] = {
+                "profiles": int(column.size),
+                "sum": round(float(column.sum()), 1),
+                "mean": round(float(column.mean()), 2),
+                "std": round(float(column.std()), 2),
+                "min": float(column.min()),
+                **{f"p{p}": round(float(v), 2) for p, v in zip(COHORT_PERCENTILES, pct)},
+                "max": float(column.max()),
+            }
+        return out
+
+    def percentile_ranks(self):
+        """Percentile rank (0-100] of every profile on every value; NaN where unknown."""
+        np = load_numpy()
+        ranks = np.full(self.values.shape, np.nan)
+        for j in range(len(COHORT_VALUES)):
+            column = self.values[:, j]
+            known = ~np.isnan(column)
+            ordered = np.sort(column[known])
+            if ordered.size:
+                ranks[known, j] = np.searchsorted(ordered, column[known], side="right") * 100 / ordered.size
+        return ranks
+
+    def language_report(self, top: int = 30) -> dict:
+        np = load_numpy()
+        totals = self.languages.sum(axis=0)
+        using = (self.languages > 0).sum(axis=0)
+        per_profile = self.languages.sum(axis=1, keepdims=True)
+        shares = np.divide(self.languages, per_profile, out=np.zeros_like(self.languages), where=per_profile > 0)
+        order = np.argsort(-totals, kind="stable")[:top]
+        return {
+            self.language_names[i]: {
+                "own_repos": int(totals[i]),
+                "profiles_using": int(using[i]),
+                "mean_share_pct": round(float(shares[:, i].mean()) * 100, 2),
+            }
+            for i in order
+        }
+
+    def timeline_report(self) -> dict:
+        np = load_numpy()
+        repos = self.timeline.sum(axis=0)
+        active = (self.timeline > 0).sum(axis=0)
+        return {
+            year: {"own_repos_created": int(repos[i]), "active_profiles": int(active[i]),
+                   "median_per_active_profile": float(np.median(self.timeline[self.timeline[:, i] > 0, i]))}
+            for i, year in enumerate(self.years)
+        }
+
+    def domain_report(self) -> dict:
+        np = load_numpy()
+        forks = self.domains.sum(axis=0)
+        return {
+            self.domain_names[i]: {"forks": int(forks[i]), "profiles": int((self.domains[:, i] > 0).sum())}
+            for i in np.argsort(-forks, kind="stable")
+        }
+
+    def rankings(self, ranks, top: int = 10) -> dict:
+        np = load_numpy()
+        out = {}
+        for name in ("stars", "top_repo_stars", "followers", "own_repos", "contributions_this_year"):
+            j = COHORT_VALUES.index(name)
+            column = np.nan_to_num(self.values[:, j], nan=-np.inf)
+            order = np.argsort(-column, kind="stable")[:top]
+            out[name] = [
+                {"login": self.logins[i], "value": float(self.values[i, j]), "percentile": round(float(ranks[i, j]), 1)}
+                for i in order if not np.isnan(self.values[i, j])
+            ]
+        return out
+
+    def similar(self, k: int = 5, workers: int = 4) -> dict:
+        """k most similar profiles of each one: cosine similarity of their language mixes.
+
+        The similarity matrix is computed in row blocks (matrix products,
+        which release the GIL) spread over `workers` threads, so memory stays
+        at SIMILARITY_BLOCK × profiles whatever the cohort size.
+        """
+        np = load_numpy()
+        n = len(self.logins)
+        k = min(k, n - 1)
+        if k <= 0 or not self.language_names:
+            return {}
+        norms = np.linalg.norm(self.languages, axis=1, keepdims=True)
+        unit = np.divide(self.languages, norms, out=np.zeros_like(self.languages), where=norms > 0)
+
+        def block(start):
+            sims = unit[start:start + self.SIMILARITY_BLOCK] @ unit.T
+            rows = np.arange(sims.shape[0])
+            sims[rows, start + rows] = -np.inf  # not oneself
+            best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(sims, best, axis=1)
+            order = np.argsort(-scores, axis=1, kind="stable")
+            return np.take_along_axis(best, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+        out = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            starts = range(0, n, self.SIMILARITY_BLOCK)
+            for start, (best, scores) in zip(starts, pool.map(block, starts)):
+                for offset, (idx, sc) in enumerate(zip(best, scores)):
+                    if norms[start + offset, 0] > 0:
+                        out[self.logins[start + offset]] = [
+                            {"login": self.logins[i], "score": round(float(s), 4)} for i, s in zip(idx, sc) if s > 0
+                        ]
+        return out
+
+    def report(self, k: int = 5, workers: int = 4) -> dict:
+        ranks = self.percentile_ranks()
+        return {
+            "aggregates": self.aggregates(),
+            "languages": self.language_report(),
+            "timeline": self.timeline_report(),
+            "fork_domains": self.domain_report(),
+            "rankings": self.rankings(ranks),
+            "similar_profiles": self.similar(k, workers),
+            "profiles": [
+                {
+                    "login": login,
+                    **{name: (None if math.isnan(v) else float(v)) for name, v in zip(COHORT_VALUES, self.values[i])},
+                    "percentiles": {
+                        name: round(float(r), 1) for name, r in zip(COHORT_VALUES, ranks[i]) if not math.isnan(r)
+                    },
+                }
+                for i, login in enumerate(self.logins)
+            ],
+        }
+
+
+def analyse_cohort(inputs: list[str], args: argparse.Namespace) -> dict:
+    t0 = time.perf_counter()
+    rows = load_cohort(inputs, args.jobs)
+    if not rows:
+        raise AnalysisError("no profile report found in the --cohort inputs")
+    loaded = time.perf_counter()
+    print(f"  ✓ {len(rows)} profiles loaded in {loaded - t0:.2f}s")
+    print("→ Analyzing cohort…")
+    report = Cohort(rows).report(args.similar, args.jobs)
+    return {
+        "_meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "generator": "analyse-profile.py",
+            "profiles": len(rows),
+            "sources": inputs,
+            "timings_s": {"load": round(loaded - t0, 3), "analyse": round(time.perf_counter() - loaded, 3)},
+        },
+        **report,
+    }
+
+
+# ─── Report Writers ──────────────────────────────────────────────────────────
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """UTF-8 JSON, through orjson when it is installed."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode()
+
+
+class ReportWriter(abc.ABC):
+    """Writes a report section by section to `<path>.tmp`, renamed on success.
+
+    Used as a context manager: an exception discards the partial file, so a
+    failed run never leaves a truncated report in place.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp = f"{path}.tmp"
+        self.f = open(self.tmp, "wb")
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def section(self, key: str, value):
+        """Write one top-level report key."""
+
+    def repo(self, r):
+        """Called once per repo while they stream in; ignored by default."""
+
+    def finish(self):
         pass
-    return None
 
+    def __enter__(self):
+        return self
 
-def main():
-    parser = argparse.ArgumentParser(description="Full GitHub profile analyzer → analyse-profile.json")
-    parser.add_argument("--username", "-u", required=True)
-    parser.add_argument("--output", "-o", default="analyse-profile.json")
-    args = parser.parse_args()
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        self.f.close()
+        if exc_type is None:
+            os.replace(self.tmp, self.path)
+        else:
+            os.remove(self.tmp)
 
-    token = get_token()
-    if token:
-        print("✓ GitHub token detected")
-    else:
-        print("⚠ No token — rate limit will be low (60 req/h)")
 
-    client = GitHubClient(token)
-    analyzer = ProfileAnalyzer(client, args.username)
+class JsonReportWriter(ReportWriter):
+    """The classic indented analyse-profile.json, one top-level key at a time."""
 
-    # 1. User profile
-    user = analyzer.fetch_user()
-    if not user:
-        print("✗ Could not fetch user profile")
-        sys.exit(1)
-    print(f"  ✓ {user.get('name')} — {user.get('public_repos')} public repos")
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.f.write(b"{")
+        self.first = True
 
-    # 2. ALL repos
-    repos = analyzer.fetch_all_repos()
+    def section(self, key: str, value):
+        body = dumps(value, indent=True).replace(b"\n", b"\n  ")
+        self.f.write(b"%s\n  %s: %s" % (b"" if self.first else b",", dumps(key), body))
+        self.first = False
 
-    # 3. Orgs
-    orgs = analyzer.fetch_orgs()
-    print(f"  ✓ {len(orgs)} organizations")
+    def finish(self):
+        self.f.write(b"\n}\n" if not self.first else b"}\n")
 
-    # 4. Starred count
-    starred = analyzer.fetch_starred_count()
-    print(f"  ✓ {starred} starred repos")
 
-    # 5. Contributions (GraphQL)
-    contrib_data = analyzer.fetch_contributions()
+class JsonlReportWriter(ReportWriter):
+    """Compact JSONL: one {"record": "repo"} line per repo, then one aggregate record."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.aggregate = {"record": "aggregate"}
+
+    def repo(self, r):
+        r = RepoRecord.from_api(r)
+        line = dumps({"record": "repo", "fork": r.fork, **repo_summary(r)}) + b"\n"
+        with self._lock:
+            self.f.write(line)
+
+    def section(self, key: str, value):
+        self.aggregate[key] = value
+
+    def finish(self):
+        self.f.write(dumps(self.aggregate) + b"\n")
+
+
+REPORT_WRITERS = {"json": JsonReportWriter, "jsonl": JsonlReportWriter}
+
+
+# ─── Profile Service ─────────────────────────────────────────────────────────
+
+GITHUB_LOGIN = re.compile(r"^[A-Za-z0-9](?:-?[A-Za-z0-9]){0,38}$")
+
+
+def parse_address(text: str) -> tuple[str, object]:
+    """'unix:/path.sock', 'host:port' or 'port' -> ("unix", path) or ("tcp", (host, port))."""
+    if text.startswith("unix:"):
+        return "unix", text[5:]
+    host, _, port = text.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class ProfileService:
+    """Long-running analyses kept warm in memory (--serve).
+
+    One client (keep-alive session, conditional-request cache, rate limiter)
+    serves every refresh. Each watched profile is re-analysed every
+    `interval` seconds, first runs staggered over the interval; a refresh
+    the core budget cannot cover waits for the reset instead of starving
+    the others. Reports are serialised once per refresh, so a query only
+    copies bytes out of memory.
+    """
+
+    MAX_FAILED = 1000  # first-analysis errors kept for the next query of that name
+
+    def __init__(self, client: GitHubClient, args: argparse.Namespace, db: SnapshotDB | None = None):
+        self.client = client
+        self.args = args
+        self.db = db
+        self.interval = args.refresh_minutes * 60
+        self.entries = {}  # username -> {"body", "etag", "refreshed_at", "public_repos", "error"}
+        self.due = []  # heap of (due time, username); entries not matching `scheduled` are stale
+        self.scheduled = {}  # username.lower() -> its one pending due time
+        self.failed = {}  # username.lower() -> error of a first analysis that failed; no longer watched
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stopped = False
+
+    def watch(self, usernames: list[str]):
+        """Schedule new profiles, spread evenly over one refresh interval."""
+        now = time.time()
+        with self._lock:
+            fresh = [u for u in usernames if u.lower() not in self.entries]
+            for i, username in enumerate(fresh):
+                self.failed.pop(username.lower(), None)
+                self.entries[username.lower()] = {"username": username, "body": None, "etag": None,
+                                                  "refreshed_at": None, "public_repos": 0, "error": None}
+                self._schedule(username, now + self.interval * i / len(fresh))
+
+    def refresh_soon(self, username: str):
+        """Move the next refresh to now; nothing to do if it is due or in progress already."""
+        with self._lock:
+            if self.scheduled.get(username.lower(), 0) > time.time():
+                self._schedule(self.entries[username.lower()]["username"], 0)
+
+    def _schedule(self, username: str, when: float):
+        """(Re)schedule `username`, superseding its previous due time; called with the lock held."""
+        self.scheduled[username.lower()] = when
+        heapq.heappush(self.due, (when, username))
+        self._wake.notify_all()
+
+    def entry(self, username: str) -> dict | None:
+        return self.entries.get(username.lower())
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"username": e["username"], "refreshed_at": e["refreshed_at"], "ready": e["body"] is not None,
+                 "error": e["error"]}
+                for e in self.entries.values()
+            ]
+
+    def _next(self) -> str | None:
+        """Block until a profile is due; None once stopped."""
+        with self._lock:
+            while not self._stopped:
+                if self.due and self.due[0][0] <= time.time():
+                    when, username = heapq.heappop(self.due)
+                    if self.scheduled.get(username.lower()) != when:
+                        continue  # superseded by refresh_soon()
+                    del self.scheduled[username.lower()]
+                    return username
+                self._wake.wait(self.due[0][0] - time.time() if self.due else None)
+            return None
+
+    def _budget_delay(self, username: str) -> float:
+        """Seconds to wait before this refresh fits the remaining core budget."""
+        bucket = self.client.limiter.buckets.get("core")
+        now = time.time()
+        if not bucket or bucket["reset"] <= now:
+            return 0
+        needed = estimate_requests({"public_repos": self.entry(username)["public_repos"]})
+        # keep a reserve for the other watched profiles and for queries of new ones
+        if bucket["remaining"] - needed >= bucket["limit"] * self.client.limiter.low_water:
+            return 0
+        return bucket["reset"] - now + 1
+
+    def worker(self):
+        while (username := self._next()) is not None:
+            delay = 0
+            try:
+                delay = self._budget_delay(username)
+                if delay:
+                    print(f"  ⏳ {username}: rate-limit budget short, refresh postponed {delay:.0f}s")
+                else:
+                    self.refresh(username)
+            except Exception as e:  # network, disk, DB…: a failed refresh must not kill the worker
+                self._failed(username, f"{type(e).__name__}: {e}")
+            finally:
+                with self._lock:
+                    if username.lower() in self.entries:  # dropped by _failed() otherwise
+                        self._schedule(username, time.time() + (delay or self.interval))
+
+    def refresh(self, username: str):
+        opts = argparse.Namespace(**vars(self.args))
+        if self.args.state:
+            opts.state = os.path.join(self.args.state, f"{username}.json")
+        try:
+            result = analyse_profile(self.client, username, opts, db=self.db)
+        except (AnalysisError, RateLimitError) as e:
+            self._failed(username, str(e))
+            return
+        body = dumps(result, indent=True)
+        # swap the whole entry at once: readers never see a half-updated one
+        self.entries[username.lower()] = {
+            "username": username,
+            "body": body,
+            "etag": f'"{hashlib.sha1(body).hexdigest()}"',
+            "refreshed_at": result["_meta"]["generated_at"],
+            "public_repos": result["profile"].get("public_repos") or 0,
+            "error": None,
+        }
+        print(f"✓ {username} refreshed ({len(body) / 1024:.0f} KiB)")
+
+    def _failed(self, username: str, error: str):
+        """Record a failed refresh; a profile never analysed successfully stops being watched."""
+        entry = self.entry(username)
+        if entry["body"]:
+            print(f"✗ {username}: {error} — still serving the previous analysis")
+            entry["error"] = error
+            return
+        print(f"✗ {username}: {error} — no longer watched")
+        with self._lock:
+            del self.entries[username.lower()]
+            self.scheduled.pop(username.lower(), None)
+            self.failed[username.lower()] = error
+            if len(self.failed) > self.MAX_FAILED:
+                del self.failed[next(iter(self.failed))]
+
+    def take_failure(self, username: str) -> str | None:
+        """The error that dropped `username`, reported once: a later query watches it again."""
+        with self._lock:
+            return self.failed.pop(username.lower(), None)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._wake.notify_all()
+
+
+def make_handler(service: ProfileService):
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        """GET /profiles, GET /profiles/<user>, POST /profiles/<user>/refresh, GET /health."""
+
+        server_version = "analyse-profile"
+        protocol_version = "HTTP/1.1"  # keep-alive: pollers reuse their connection
+        disable_nagle_algorithm = True  # TCP: headers and body go out as separate writes
+
+        def address_string(self):
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def log_message(self, format, *args):
+            pass  # queries are far too frequent to log
+
+        def send_body(self, status: int, body: bytes, etag: str | None = None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if parts == ["health"]:
+                return self.send_body(200, b'{"status": "ok"}')
+            if parts == ["profiles"]:
+                return self.send_body(200, dumps(service.status()))
+            if len(parts) != 2 or parts[0] != "profiles":
+                return self.send_body(404, b'{"error": "not found"}')
+            if not GITHUB_LOGIN.match(parts[1]):
+                return self.send_body(400, b'{"error": "invalid username"}')
+            entry = service.entry(parts[1])
+            if entry is None:
+                if error := service.take_failure(parts[1]):
+                    return self.send_body(502, dumps({"error": error}))
+                service.watch([parts[1]])
+                return self.send_body(202, b'{"status": "scheduled"}')
+            if entry["body"] is None:
+                return self.send_body(202, b'{"status": "pending"}')
+            if self.headers.get("If-None-Match") == entry["etag"]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_body(200, entry["body"], entry["etag"])
+
+        def do_POST(self):
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 3 and parts[0] == "profiles" and parts[2] == "refresh" and service.entry(parts[1]):
+                service.refresh_soon(parts[1])
+                return self.send_body(202, b'{"status": "scheduled"}')
+            self.send_body(404, b'{"error": "not found"}')
+
+    return Handler
+
+
+def serve(client: GitHubClient, usernames: list[str], args: argparse.Namespace, db: SnapshotDB | None = None):
+    """Run the profile service until interrupted."""
+    import socketserver
+    from http.server import ThreadingHTTPServer
+
+    if args.state:
+        os.makedirs(args.state, exist_ok=True)
+    service = ProfileService(client, args, db)
+    service.watch(usernames)
+    kind, address = parse_address(args.serve)
+    handler = make_handler(service)
+    if kind == "unix":
+        class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        handler.disable_nagle_algorithm = False  # no TCP_NODELAY on unix sockets
+        if os.path.exists(address):
+            os.remove(address)
+        server = ThreadingUnixHTTPServer(address, handler)
+    else:
+        server = ThreadingHTTPServer(address, handler)
+    workers = [threading.Thread(target=service.worker, daemon=True) for _ in range(max(1, args.jobs))]
+    for w in workers:
+        w.start()
+    print(f"✓ Serving {len(usernames)} profiles on {args.serve} (refresh every {args.refresh_minutes:g} min)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
+    finally:
+        service.stop()
+        server.server_close()
+        if kind == "unix":
+            os.remove(address)
+
+
+def fetch_from_server(address: str, username: str, wait: float) -> bytes:
+    """Thin client: a profile's report from a --serve process, waiting while it is computed."""
+    import http.client
+    import socket
+
+    kind, target = parse_address(address)
+    deadline = time.monotonic() + wait
+    while True:
+        if kind == "unix":
+            conn = http.client.HTTPConnection("localhost")
+            conn.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.sock.connect(target)
+        else:
+            conn = http.client.HTTPConnection(*target)
+        try:
+            conn.request("GET", f"/profiles/{username}")
+            resp = conn.getresponse()
+            body = resp.read()
+        finally:
+            conn.close()
+        if resp.status == 200:
+            return body
+        if resp.status != 202:
+            raise AnalysisError(f"server answered {resp.status}: {body.decode(errors='replace')}")
+        if time.monotonic() > deadline:
+            raise AnalysisError(f"{username} is still being analysed by the server")
+        time.sleep(1)
 
-    # 6. Events
-    events = analyzer.fetch_events()
-    print(f"  ✓ {len(events)} recent events")
 
-    # ── Build final JSON ─────────────────────────────────────────────────────
+# ─── Main ─────────────────────────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=None)
+def get_token() -> str | None:
+    """GITHUB_TOKEN, else `gh auth token`; looked up once, when the first request needs it."""
+    token = os.environ.get("GITHUB_TOKEN")
+    if not token:
+        import subprocess
+        try:
+            r = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True, timeout=10)
+            if r.returncode == 0:
+                token = r.stdout.strip() or None
+        except (subprocess.SubprocessError, FileNotFoundError):
+            pass
+    print("✓ GitHub token detected" if token else "⚠ No token — rate limit will be low (60 req/h)")
+    return token
+
+
+def analyse_profile(client: GitHubClient, username: str, args: argparse.Namespace,
+                    writer: ReportWriter | None = None, db: SnapshotDB | None = None) -> dict:
+    """Fetch and analyse one profile; returns the analyse-profile.json document.
+
+    With a writer, repos are streamed to it as they arrive and every report
+    section is written as soon as it is computed.
+    """
+    checkpoint = None
+    if not (args.no_checkpoint or args.replay):
+        checkpoint = Checkpoint(args.work_dir, username.lower(), resume=args.resume)
+    analyzer = ProfileAnalyzer(client, username, checkpoint)
+    started_at = datetime.now(timezone.utc)
+    classifier = load_classifier(args.domains)
+    state = None
+    if args.state and not args.full:
+        state = load_state(args.state, username, args.state_max_age_days)
+
+    def use_graphql():
+        return args.graphql and (args.replay or client.authenticated)
+
+    def repos_stage(user):
+        """Aggregate repos while they stream in; keep the records only for the snapshot.
+
+        Also returns (full_name, pushed_at) of own repos still lacking
+        per-language bytes, for the languages stage.
+        """
+        agg, kept, need_languages = RepoAggregator(classifier), [] if (args.state or db) else None, []
+        graphql = use_graphql()
+        if args.graphql and not graphql:
+            print("  ⚠ --graphql needs a token — using the REST listing")
+        if state:
+            repos = kept = analyzer.fetch_repos_since(state, user.get("public_repos"))
+        elif graphql:
+            fields = DEFAULT_GRAPHQL_FIELDS + (("full_name", "languages") if args.language_bytes else ())
+            repos = analyzer.iter_repos_graphql(fields)
+        else:
+            repos = analyzer.iter_repos()
+        for r in repos:
+            agg.add(r)
+            if writer:
+                writer.repo(r)
+            if kept is not None and not state:
+                kept.append(r)
+            if args.language_bytes and not r.fork and r.languages is None:
+                need_languages.append((r.full_name or f"{username}/{r.name}", r.pushed_at))
+        return agg, kept, need_languages
+
+    def languages_stage(repos):
+        """Real bytes per language for own repos (optional, one call per changed repo, or per 20 with --graphql)."""
+        agg, _, need_languages = repos
+        if need_languages:
+            cache = LanguageCache.shared(args.languages_cache)
+            fetched = analyzer.fetch_language_bytes(need_languages, cache, args.languages_concurrency, use_graphql())
+            for languages in fetched.values():
+                agg.add_languages(languages)
+
+    # 1. User profile — every other stage waits for it
+    def user_stage():
+        user = analyzer.fetch_user()
+        if not user:
+            raise AnalysisError(f"Could not fetch user profile: {username}")
+        print(f"  ✓ {user.get('name')} — {user.get('public_repos')} public repos")
+        language_calls = 0
+        if args.language_bytes and not use_graphql():  # GraphQL lookups are billed to the graphql bucket
+            language_calls = uncached_languages(username, user.get("public_repos") or 0,
+                                                LanguageCache.shared(args.languages_cache))
+        check_budget(client, estimate_requests(user, language_calls=language_calls), strict=client.cache is None)
+        return user
+
+    def orgs_stage(_user):
+        orgs = analyzer.fetch_orgs()
+        print(f"  ✓ {len(orgs)} organizations")
+        return orgs
+
+    def starred_stage(_user):
+        starred = analyzer.fetch_starred_count()
+        print(f"  ✓ {starred} starred repos")
+        return starred
+
+    def events_stage(_user):
+        if not db:
+            events = analyzer.fetch_events()
+            print(f"  ✓ {len(events)} recent events")
+            return events
+        # stored history: fetch only what is newer, then read the API window back
+        new = db.add_events(username, analyzer.fetch_events(db.recent_event_ids(username)))
+        events = db.recent_events(username)
+        print(f"  ✓ {new} new events, {len(events)} in the last 90 days")
+        return events
+
+    def contributions_stage(user):
+        return analyzer.fetch_contributions(user.get("created_at"))
+
+    def checkpointed(name, fn, encode=None, decode=None):
+        """Run a stage once: its JSON result is saved, and read back by --resume."""
+        if not checkpoint:
+            return fn
+
+        def run(*deps):
+            saved = checkpoint.load("stage", name)
+            if saved is not None:
+                print(f"  ↺ {name}: resumed from checkpoint")
+                return decode(saved) if decode else saved
+            out = fn(*deps)
+            checkpoint.save("stage", name, encode(out) if encode else out)
+            return out
+        return run
+
+    def encode_contributions(user):
+        history = user.get("contributionHistory")
+        return {**user, "contributionHistory": history.to_json()} if history else user
+
+    def decode_contributions(user):
+        history = user.get("contributionHistory")
+        return {**user, "contributionHistory": ContributionHistory.from_json(history)} if history else user
+
+    # 2-6. repos, orgs, starred count, contributions (GraphQL) and events in parallel;
+    # repos are checkpointed page by page, the other stages as a whole
+    stages = {
+        "user": (checkpointed("user", user_stage), ()),
+        "repos": (repos_stage, ("user",)),
+        "orgs": (checkpointed("orgs", orgs_stage), ("user",)),
+        "starred": (checkpointed("starred", starred_stage), ("user",)),
+        "contributions": (checkpointed("contributions", contributions_stage,
+                                       encode_contributions, decode_contributions), ("user",)),
+        "events": (checkpointed("events", events_stage), ("user",)),
+    }
+    if args.language_bytes:
+        stages["languages"] = (languages_stage, ("repos",))
+    fetched, timings = run_stages(stages)
+    user, (repo_agg, repos, _), orgs = fetched["user"], fetched["repos"], fetched["orgs"]
+    starred, contrib_data, events = fetched["starred"], fetched["contributions"], fetched["events"]
+    print("  ⏱ " + ", ".join(f"{name} {secs:.2f}s" for name, secs in timings.items()))
+    if client.cache:
+        print(f"  ↺ {client.cache.hits} responses unchanged (304), {client.cache.misses} downloaded  [rate left: {client.rate_remaining}]")
+    if checkpoint and checkpoint.resumed:
+        print(f"  ↺ {checkpoint.resumed} pages / stages resumed from {checkpoint.path}")
+
+    if args.state:
+        save_state(args.state, username, started_at, repos)
+
+    # ── Build final JSON, section by section ─────────────────────────────────
     print("\n→ Analyzing…")
-    repo_analysis = analyse_repos(repos, args.username)
-    event_analysis = analyse_events(events)
-    contrib_analysis = analyse_contributions(contrib_data)
+    result = {}
+
+    def emit(key, value):
+        result[key] = value
+        if writer:
+            writer.section(key, value)
 
     now = datetime.now(timezone.utc)
     created = datetime.fromisoformat(user["created_at"].replace("Z", "+00:00"))
     account_age_years = round((now - created).days / 365.25, 1)
 
-    result = {
-        "_meta": {
-            "generated_at": now.isoformat(),
-            "generator": "analyse-profile.py",
-            "username": args.username,
-        },
-        "profile": {
-            "login": user.get("login"),
-            "id": user.get("id"),
-            "name": user.get("name"),
-            "bio": user.get("bio"),
-            "location": user.get("location"),
-            "company": user.get("company"),
-            "blog": user.get("blog"),
-            "twitter_username": user.get("twitter_username"),
-            "hireable": user.get("hireable"),
-            "avatar_url": user.get("avatar_url"),
-            "html_url": user.get("html_url"),
-            "followers": user.get("followers"),
-            "following": user.get("following"),
-            "public_repos": user.get("public_repos"),
-            "public_gists": user.get("public_gists"),
-            "created_at": user.get("created_at"),
-            "account_age_years": account_age_years,
-            "starred_repos_count": starred,
-        },
-        "organizations": [
-            {"login": o.get("login"), "name": o.get("description") or o.get("login"), "avatar": o.get("avatar_url")}
-            for o in orgs
-        ],
-        "contributions": contrib_analysis,
-        "repositories": repo_analysis,
-        "recent_activity": event_analysis,
+    emit("_meta", {
+        "generated_at": now.isoformat(),
+        "generator": "analyse-profile.py",
+        "username": username,
+        "stage_timings_s": timings,
+    })
+    emit("profile", {
+        "login": user.get("login"),
+        "id": user.get("id"),
+        "name": user.get("name"),
+        "bio": user.get("bio"),
+        "location": user.get("location"),
+        "company": user.get("company"),
+        "blog": user.get("blog"),
+        "twitter_username": user.get("twitter_username"),
+        "hireable": user.get("hireable"),
+        "avatar_url": user.get("avatar_url"),
+        "html_url": user.get("html_url"),
+        "followers": user.get("followers"),
+        "following": user.get("following"),
+        "public_repos": user.get("public_repos"),
+        "public_gists": user.get("public_gists"),
+        "created_at": user.get("created_at"),
+        "account_age_years": account_age_years,
+        "starred_repos_count": starred,
+    })
+    emit("organizations", [
+        {"login": o.get("login"), "name": o.get("description") or o.get("login"), "avatar": o.get("avatar_url")}
+        for o in orgs
+    ])
+    emit("contributions", analyse_contributions(contrib_data))
+    emit("repositories", repo_agg.result())
+    emit("recent_activity", analyse_events(events, db.event_activity(username) if db else None))
+    if db:
+        history = contrib_data.get("contributionHistory")
+        if history:
+            days = history.days()
+        else:
+            cal = (contrib_data.get("contributionsCollection") or {}).get("contributionCalendar") or {}
+            days = ((d["date"], d.get("contributionCount", 0)) for w in cal.get("weeks", [])
+                    for d in w.get("contributionDays", []))
+        db.record_run(username, result, repos, days)
+    if checkpoint:
+        checkpoint.clear()
+    return result
+
+
+def read_usernames(path: str) -> list[str]:
+    """Usernames from a file (or stdin for '-'), skipping blanks and # comments."""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with f:
+        names = [line.split("#", 1)[0].strip() for line in f]
+    return list(dict.fromkeys(n for n in names if n))
+
+
+def run_batch(client: GitHubClient, usernames: list[str], args: argparse.Namespace,
+              db: SnapshotDB | None = None) -> int:
+    """Analyse many profiles concurrently over one client; returns the failure count."""
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    if args.state:
+        os.makedirs(args.state, exist_ok=True)
+    jsonl = open(args.jsonl, "ab") if args.jsonl else None
+    lock = threading.Lock()
+    failures = 0
+
+    def one(username):
+        opts = argparse.Namespace(**vars(args))
+        if args.state:
+            opts.state = os.path.join(args.state, f"{username}.json")
+        if not args.output_dir:
+            return analyse_profile(client, username, opts, db=db)
+        path = os.path.join(args.output_dir, f"{username}.{args.format}")
+        with REPORT_WRITERS[args.format](path) as writer:
+            return analyse_profile(client, username, opts, writer, db)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, args.jobs))
+    try:
+        futures = {pool.submit(one, u): u for u in usernames}
+        for fut in as_completed(futures):
+            username = futures[fut]
+            try:
+                result = fut.result()
+            except (AnalysisError, RateLimitError) as e:
+                failures += 1
+                print(f"✗ {username}: {e}")
+                continue
+            except Exception as e:  # disk, DB…: one profile's failure must not abort the batch
+                failures += 1
+                print(f"✗ {username}: {type(e).__name__}: {e}")
+                continue
+            if jsonl:
+                with lock:
+                    jsonl.write(dumps(result) + b"\n")
+                    jsonl.flush()
+            print(f"✓ {username}: {result['repositories']['counts']['total_repos']} repos analyzed")
+    except KeyboardInterrupt:
+        # queued profiles are dropped and running ones stop at their next request
+        client.interrupted.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        if jsonl:
+            jsonl.close()
+    pool.shutdown()
+    print(f"\n✓ {len(usernames) - failures}/{len(usernames)} profiles analysed")
+    return failures
+
+
+def member_repos(client: GitHubClient, login: str, classifier: DomainClassifier) -> tuple[dict, RepoAggregator]:
+    """One --org member: a short profile and the aggregation of their own repos."""
+    analyzer = ProfileAnalyzer(client, login)
+    user = analyzer.fetch_user()
+    if not user:
+        raise AnalysisError(f"Could not fetch user profile: {login}")
+    agg = RepoAggregator(classifier).update(analyzer.iter_repos())
+    top_language = agg.lang_counter.most_common(1)
+    return {
+        "login": user.get("login"),
+        "name": user.get("name"),
+        "followers": user.get("followers"),
+        "public_repos": user.get("public_repos"),
+        "own_repos": agg.own,
+        "stars_received": agg.stars,
+        "top_language": top_language[0][0] if top_language else None,
+    }, agg
+
+
+_member_worker = {}  # per process: the client and classifier of analyse_member()
+
+
+def init_member_worker(token: str | None, args: argparse.Namespace):
+    """Process-pool initializer: one client per worker process, quiet (the parent reports progress)."""
+    sys.stdout = open(os.devnull, "w")
+    session = ReplaySession(args.replay, args.replay_latency / 1000) if args.replay else None
+    cache = None if (args.no_cache or args.replay) else ResponseCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    _member_worker["client"] = GitHubClient(token, concurrency=args.concurrency, cache=cache,
+                                            limiter=RateLimiter(max_wait=args.max_wait), session=session)
+    _member_worker["classifier"] = load_classifier(args.domains)
+
+
+def analyse_member(login: str) -> tuple[dict, RepoAggregator]:
+    return member_repos(_member_worker["client"], login, _member_worker["classifier"])
+
+
+def analyse_members(client: GitHubClient, logins: list[str], args: argparse.Namespace) -> dict:
+    """Analyse every member's own repos and merge them into one aggregation.
+
+    With --member-processes > 1 the members are spread over a process pool
+    (each process has its own client and rate limiter), else over --jobs
+    threads sharing `client`. Partial aggregators are merged in member
+    order, so the report does not depend on completion order.
+    """
+    classifier = load_classifier(args.domains)
+    # at least a profile and one repo page per member; their repo counts are not known yet
+    check_budget(client, 2 * len(logins), strict=client.cache is None)
+    if args.member_processes > 1 and not args.record:
+        token = None if args.replay else get_token()
+        pool = ProcessPoolExecutor(args.member_processes, initializer=init_member_worker, initargs=(token, args))
+        futures = {pool.submit(analyse_member, login): login for login in logins}
+    else:
+        pool = ThreadPoolExecutor(max_workers=max(1, args.jobs))
+        futures = {pool.submit(member_repos, client, login, classifier): login for login in logins}
+    print(f"→ Analysing {len(logins)} members…")
+    results, failed = {}, []
+    try:
+        for done, fut in enumerate(as_completed(futures), 1):
+            login = futures[fut]
+            try:
+                results[login] = fut.result()
+            except (AnalysisError, RateLimitError) as e:
+                failed.append(login)
+                print(f"  ✗ {login}: {e}")
+            if done % 10 == 0 or done == len(futures):
+                print(f"    … {done}/{len(futures)} members analysed")
+    except KeyboardInterrupt:
+        # member processes get the SIGINT too; threads stop at their next request
+        client.interrupted.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    merged, profiles = RepoAggregator(classifier), []
+    for login in logins:
+        if login in results:
+            profile, agg = results[login]
+            profiles.append(profile)
+            merged.merge(agg)
+    profiles.sort(key=lambda p: p["stars_received"], reverse=True)
+    return {
+        "analysed": len(profiles),
+        "failed": failed,
+        "profiles": profiles,
+        "repositories": merged.result(),
     }
 
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+
+def analyse_org(client: GitHubClient, org: str, args: argparse.Namespace,
+                writer: ReportWriter | None = None) -> dict:
+    """Organisation report: its public repos aggregated, its members and, with --members, their repos."""
+    checkpoint = None
+    if not (args.no_checkpoint or args.replay):
+        checkpoint = Checkpoint(args.work_dir, f"org-{org.lower()}", resume=args.resume)
+    analyzer = OrgAnalyzer(client, org, checkpoint)
+    classifier = load_classifier(args.domains)
+
+    def org_stage():
+        info = analyzer.fetch_org()
+        if not info:
+            raise AnalysisError(f"Could not fetch organization: {org}")
+        print(f"  ✓ {info.get('name') or org} — {info.get('public_repos')} public repos")
+        check_budget(client, estimate_requests(info), strict=client.cache is None)
+        return info
+
+    def repos_stage(_info):
+        agg = RepoAggregator(classifier)
+        for r in analyzer.iter_repos():
+            agg.add(r)
+            if writer:
+                writer.repo(r)
+        return agg
+
+    def members_stage(_info):
+        members = analyzer.fetch_members()
+        print(f"  ✓ {len(members)} members")
+        return members
+
+    # org repos and members are both paginated concurrently, side by side
+    fetched, timings = run_stages({
+        "org": (org_stage, ()),
+        "repos": (repos_stage, ("org",)),
+        "members": (members_stage, ("org",)),
+    })
+    info, repo_agg, members = fetched["org"], fetched["repos"], fetched["members"]
+    print("  ⏱ " + ", ".join(f"{name} {secs:.2f}s" for name, secs in timings.items()))
+
+    logins = [m["login"] for m in members]
+    member_section = {"count": len(logins), "logins": logins}
+    if args.members and logins:
+        member_section.update(analyse_members(client, logins, args))
+
+    print("\n→ Analyzing…")
+    result = {}
+
+    def emit(key, value):
+        result[key] = value
+        if writer:
+            writer.section(key, value)
+
+    emit("_meta", {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "generator": "analyse-profile.py",
+        "organization": org,
+        "stage_timings_s": timings,
+    })
+    emit("organization", {
+        "login": info.get("login"),
+        "id": info.get("id"),
+        "name": info.get("name"),
+        "description": info.get("description"),
+        "blog": info.get("blog"),
+        "location": info.get("location"),
+        "email": info.get("email"),
+        "avatar_url": info.get("avatar_url"),
+        "html_url": info.get("html_url"),
+        "followers": info.get("followers"),
+        "public_repos": info.get("public_repos"),
+        "created_at": info.get("created_at"),
+    })
+    emit("repositories", repo_agg.result())
+    emit("members", member_section)
+    if checkpoint:
+        checkpoint.clear()
+    return result
+
+
+def write_profile(path: str | None):
+    if not path:
+        return
+    TRACE.write(path)
+    print(f"\n⏱ Profile written to {path} (open in chrome://tracing or ui.perfetto.dev)")
+    print(TRACE.table())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Full GitHub profile analyzer → analyse-profile.json")
+    parser.add_argument("--username", "-u")
+    parser.add_argument("--output", "-o", default="analyse-profile.json")
+    parser.add_argument("--format", choices=sorted(REPORT_WRITERS), default="json",
+                        help="json: indented report; jsonl: one line per repo plus an aggregate record")
+    parser.add_argument("--org", metavar="LOGIN",
+                        help="analyse an organisation: its public repos and members instead of a user")
+    parser.add_argument("--members", action="store_true",
+                        help="--org: also analyse every member's own repos and merge them into the report")
+    parser.add_argument("--member-processes", type=int, default=1, metavar="N",
+                        help="--org --members: spread members over N processes (1 = --jobs threads in-process)")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="analyse every username listed in FILE (one per line, '-' for stdin)")
+    parser.add_argument("--jobs", type=int, default=4,
+                        help="profiles analysed at the same time in --batch and --org --members modes")
+    parser.add_argument("--output-dir", help="--batch: write <username>.json (or .jsonl) files here")
+    parser.add_argument("--jsonl", help="--batch: append one compact line per profile to this file")
+    parser.add_argument("--domains", metavar="FILE",
+                        help="JSON {domain: [keywords]} table replacing the built-in fork domains"
+                             " (keywords match anywhere, '=word' only as a whole word)")
+    parser.add_argument("--pool-size", type=int, default=32,
+                        help="kept-alive HTTP connections shared by every request")
+    parser.add_argument("--concurrency", "-j", type=int, default=8,
+                        help="parallel page fetches once the last page is known (1 = sequential)")
+    parser.add_argument("--cache-dir", default=os.path.join(CACHE_HOME, "http"),
+                        help="on-disk HTTP cache for conditional requests (ETag / Last-Modified)")
+    parser.add_argument("--cache-max-mb", type=int, default=256, help="cache size before LRU eviction")
+    parser.add_argument("--no-cache", action="store_true", help="disable the HTTP cache")
+    parser.add_argument("--max-wait", type=float, default=900,
+                        help="longest rate-limit wait (seconds) before giving up instead of sleeping")
+    parser.add_argument("--graphql", action="store_true",
+                        help="list repositories through GraphQL (topics, license… in the same round-trips,"
+                             " --language-bytes lookups 20 repos per request; needs a token)")
+    parser.add_argument("--language-bytes", action="store_true",
+                        help="fetch real bytes per language of every own repo (cached per repo until its next push)")
+    parser.add_argument("--languages-concurrency", type=int, default=8, help="parallel /languages calls")
+    parser.add_argument("--languages-cache", default=os.path.join(CACHE_HOME, "languages.json"),
+                        help="per-repo languages cache, keyed on pushed_at")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write a Chrome trace (requests + stage timings) here and print a summary table")
+    parser.add_argument("--db", metavar="FILE", help="append every run to this SQLite history")
+    parser.add_argument("--cohort", nargs="+", metavar="PATH",
+                        help="compare many profiles: report files, directories of them, --jsonl files or --db histories"
+                             "; a login found in several inputs takes the last one's values (needs numpy)")
+    parser.add_argument("--similar", type=int, default=5, help="--cohort: most similar profiles listed for each one")
+    parser.add_argument("--query", choices=QUERIES,
+                        help="answer from --db without fetching: stars-delta, new-forks, new-repos or history")
+    parser.add_argument("--since", help="--query window: '30d', '12h' or an ISO date "
+                                        "(stars-delta: previous run; new-*: start of this month)")
+    parser.add_argument("--state", help="repo snapshot file enabling incremental runs (only repos pushed since are fetched);"
+                                        " a directory of <username>.json snapshots in --batch mode")
+    parser.add_argument("--state-max-age-days", type=float, default=7,
+                        help="force a full scan when the snapshot is older than this")
+    parser.add_argument("--full", action="store_true", help="ignore the snapshot, scan everything (and rewrite it)")
+    parser.add_argument("--work-dir", default=os.path.join(CACHE_HOME, "work"),
+                        help="checkpoints of unfinished runs (one directory per username), removed on success")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpointed pages and stages")
+    parser.add_argument("--no-checkpoint", action="store_true", help="do not checkpoint pages and stages")
+    parser.add_argument("--serve", metavar="ADDR",
+                        help="run as a service on [host:]port or unix:/path, keeping --username/--batch profiles warm")
+    parser.add_argument("--refresh-minutes", type=float, default=30, help="--serve: re-analyse each profile this often")
+    parser.add_argument("--server", metavar="ADDR",
+                        help="thin client: fetch --username's report from a --serve process instead of GitHub")
+    parser.add_argument("--server-wait", type=float, default=120,
+                        help="--server: seconds to wait for a profile the service is still analysing")
+    parser.add_argument("--record", metavar="FILE", help="save every API response to this replay fixture")
+    parser.add_argument("--replay", metavar="FILE", help="answer every API call from a --record fixture (no network)")
+    parser.add_argument("--replay-latency", type=float, default=0, metavar="MS",
+                        help="--replay: simulated latency of each request, in milliseconds")
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not (args.username or args.batch or args.org or args.serve or args.cohort):
+        parser.error("one of --username, --batch, --org, --serve or --cohort is required")
+    if args.org and (args.batch or args.query):
+        parser.error("--org cannot be combined with --batch or --query")
+    if args.query:
+        if not (args.db and args.username):
+            parser.error("--query needs --db and --username")
+        db = SnapshotDB(args.db)
+        print(json.dumps(run_query(db, args.username, args.query, args.since), ensure_ascii=False, indent=2))
+        db.close()
+        return
+    if args.cohort:
+        if load_numpy() is None:
+            parser.error("--cohort needs numpy: pip install numpy")
+        try:
+            result = analyse_cohort(args.cohort, args)
+        except (AnalysisError, OSError, ValueError) as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        with JsonReportWriter(args.output) as writer:
+            for key, value in result.items():
+                writer.section(key, value)
+        print(f"\n✓ Cohort of {result['_meta']['profiles']} profiles saved to {args.output}")
+        return
+    if args.server:
+        if not args.username:
+            parser.error("--server needs --username")
+        try:
+            body = fetch_from_server(args.server, args.username, args.server_wait)
+        except (AnalysisError, OSError) as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        tmp = f"{args.output}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, args.output)
+        print(f"✓ Analysis saved to {args.output} (from {args.server})")
+        return
+    if args.batch and not (args.output_dir or args.jsonl) and not args.serve:
+        parser.error("--batch needs --output-dir and/or --jsonl")
+    try:
+        load_classifier(args.domains)
+    except (OSError, ValueError) as e:
+        parser.error(f"--domains: {e}")
+
+    if args.serve and args.profile:
+        # a service never ends: the trace would only grow in memory
+        parser.error("--profile cannot be combined with --serve")
+    if args.record and args.replay:
+        parser.error("--record and --replay are exclusive")
+
+    session = None
+    if args.replay:
+        session = ReplaySession(args.replay, args.replay_latency / 1000)
+        print(f"↺ Replaying {args.replay} (no network)")
+
+    # fixtures hold full bodies: recording or replaying bypasses the conditional-request cache
+    no_cache = args.no_cache or args.record or args.replay
+    cache = None if no_cache else ResponseCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    client = GitHubClient(get_token, concurrency=args.concurrency, cache=cache,
+                          limiter=RateLimiter(max_wait=args.max_wait), pool_size=args.pool_size, session=session)
+    if args.record:
+        client.session = RecordingSession(client.session)
+
+    db = SnapshotDB(args.db) if args.db else None
+    TRACE.enabled = bool(args.profile)
+    if args.serve:
+        usernames = read_usernames(args.batch) if args.batch else []
+        serve(client, usernames + ([args.username] if args.username else []), args, db)
+        return
+    try:
+        if args.batch:
+            failed = run_batch(client, read_usernames(args.batch), args, db)
+            write_profile(args.profile)
+            sys.exit(1 if failed else 0)
+
+        try:
+            with REPORT_WRITERS[args.format](args.output) as writer:
+                if args.org:
+                    result = analyse_org(client, args.org, args, writer)
+                else:
+                    result = analyse_profile(client, args.username, args, writer, db)
+        except AnalysisError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        except RateLimitError as e:
+            print(f"✗ {e} — aborting rather than writing a truncated analysis")
+            if not args.no_checkpoint:
+                print("  ↺ fetched pages are checkpointed: rerun with --resume once the limit resets")
+            write_profile(args.profile)
+            sys.exit(1)
+        write_profile(args.profile)
+    except KeyboardInterrupt:
+        print("\n✗ Interrupted" + ("" if args.no_checkpoint else " — rerun with --resume to continue"))
+        sys.exit(130)
+    finally:
+        client.interrupted.set()  # stages still running after a failure stop at their next request
+        if args.record:
+            print(f"↺ {client.session.save(args.record)} responses recorded to {args.record}")
+        elif args.replay and client.session.misses:
+            print(f"⚠ {client.session.misses} requests were not in {args.replay}")
+    repo_analysis = result["repositories"]
 
     print(f"\n✓ Analysis saved to {args.output}")
     print(f"  {repo_analysis['counts']['total_repos']} repos analyzed")
     print(f"  {repo_analysis['languages']['unique_languages_count']} languages detected")
     print(f"  {repo_analysis['fork_analysis']['total_forks']} forks across {len(repo_analysis['fork_analysis']['domains'])} domains")
-    print(f"  {contrib_analysis['total_contributions_this_year']} contributions this year")
+    if args.org:
+        members = result["members"]
+        print(f"  {members['count']} members" + (f", {members['analysed']} analysed" if "analysed" in members else ""))
+    else:
+        print(f"  {result['contributions']['total_contributions_this_year']} contributions this year")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmarks hors-ligne d'analyse-profile.py
+Génère des comptes synthétiques (1k, 10k, 100k repos), les enregistre comme
+fixtures --replay, puis mesure le débit et le pic mémoire des fonctions
+d'analyse et du pipeline main() complet — sans réseau ni token.
+
+Usage:
+    python benchmark-profile.py
+    python benchmark-profile.py --sizes 1000 10000 --latency 20 --json bench.json
+    python benchmark-profile.py --baseline bench.json --tolerance 0.25   # échoue en cas de régression
+"""
+
+import argparse
+import contextlib
+import gc
+import importlib.util
+import io
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+spec = importlib.util.spec_from_file_location("analyse_profile", os.path.join(HERE, "analyse-profile.py"))
+ap = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ap)
+
+LOGIN = "bench-user"
+CREATED_AT = "2012-03-01T00:00:00Z"
+LANGUAGES = ["Python", "Go", "TypeScript", "Rust", "C", "Shell", "Jupyter Notebook", None]
+WORDS = ["llm agent", "security scanner", "kubernetes operator", "react dashboard", "mcp server",
+         "pentest toolkit", "terraform modules", "notebook experiments", "cli tool", "dotfiles"]
+EVENT_TYPES = ["PushEvent", "PullRequestEvent", "IssuesEvent", "WatchEvent", "CreateEvent", "ForkEvent"]
+
+
+# ─── Synthetic Accounts ──────────────────────────────────────────────────────
+
+def synthetic_repo(i: int, rnd: random.Random) -> dict:
+    pushed = datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(minutes=7 * i)
+    return {
+        "id": 10_000_000 + i,
+        "name": f"repo-{i}",
+        "full_name": f"{LOGIN}/repo-{i}",
+        "description": f"{rnd.choice(WORDS)} #{i}",
+        "fork": i % 3 == 0,
+        "language": rnd.choice(LANGUAGES),
+        "size": rnd.randint(1, 50_000),
+        "stargazers_count": int(rnd.paretovariate(1.2)) - 1,
+        "forks_count": rnd.randint(0, 20),
+        "watchers_count": rnd.randint(0, 50),
+        "open_issues_count": rnd.randint(0, 10),
+        "topics": rnd.sample(["ai", "security", "devops", "web", "cli", "data"], 2),
+        "license": {"spdx_id": rnd.choice(["MIT", "Apache-2.0", "GPL-3.0", "NOASSERTION"])} if i % 4 else None,
+        "created_at": "2015-06-01T00:00:00Z",
+        "pushed_at": pushed.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "homepage": "",
+        "archived": i % 17 == 0,
+        "html_url": f"https://github.com/{LOGIN}/repo-{i}",
+    }
+
+
+def synthetic_event(i: int, rnd: random.Random, repos: int) -> dict:
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(minutes=37 * i)
+    return {
+        "id": str(90_000_000 - i),
+        "type": rnd.choice(EVENT_TYPES),
+        "repo": {"name": f"{LOGIN}/repo-{rnd.randrange(repos)}"},
+        "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "payload": {"action": rnd.choice(["opened", "closed", None])},
+    }
+
+
+def synthetic_calendar(year: int) -> list[dict]:
+    rnd = random.Random(year)
+    day, today, days = date(year, 1, 1), datetime.now(timezone.utc).date(), []
+    while day.year == year and day <= today:
+        days.append({"date": day.isoformat(), "contributionCount": rnd.choice([0, 0, 1, 2, 3, 5, 8])})
+        day += timedelta(days=1)
+    return days
+
+
+class SyntheticGitHub:
+    """A session answering the endpoints analyse-profile.py calls for one synthetic account."""
+
+    def __init__(self, repos: int):
+        self.repos = repos
+        self.headers = {}
+
+    def response(self, body, headers: dict | None = None, status: int = 200) -> "ap.ReplayResponse":
+        headers = {"X-RateLimit-Remaining": "4999", "X-RateLimit-Limit": "5000", **(headers or {})}
+        return ap.ReplayResponse(status, headers, json.dumps(body).encode())
+
+    def request(self, method: str, url: str, json: dict | None = None, **kwargs):
+        if method == "POST":
+            return self.graphql(json)
+        path, _, query = url.partition("?")
+        params = dict(p.split("=", 1) for p in query.split("&") if p)
+        page, per_page = int(params.get("page", 1)), int(params.get("per_page", 30))
+        if path.endswith("/rate_limit"):
+            reset = int(time.time()) + 3600
+            bucket = {"limit": 5000, "remaining": 5000, "reset": reset}
+            return self.response({"resources": {"core": bucket, "graphql": bucket}})
+        if path.endswith(f"/users/{LOGIN}"):
+            return self.response({"login": LOGIN, "name": "Bench User", "public_repos": self.repos,
+                                  "followers": 1234, "following": 56, "created_at": CREATED_AT})
+        if path.endswith("/repos"):
+            last = max(1, -(-self.repos // per_page))
+            rnd = random.Random(page)
+            items = [synthetic_repo(i, rnd) for i in range((page - 1) * per_page, min(page * per_page, self.repos))]
+            return self.response(items, {"Link": f'<{path}?per_page={per_page}&page={last}>; rel="last"'})
+        if path.endswith("/orgs"):
+            return self.response([{"login": "bench-org"}] if page == 1 else [])
+        if path.endswith("/starred"):
+            return self.response([{}], {"Link": f'<{path}?per_page=1&page={self.repos // 10 or 1}>; rel="last"'})
+        if path.endswith("/events/public"):
+            rnd = random.Random(-page)
+            if page > 3:
+                return self.response([])
+            return self.response([synthetic_event((page - 1) * per_page + i, rnd, self.repos) for i in range(per_page)])
+        if path.endswith("/languages"):
+            return self.response({"Python": 12_000, "Shell": 300})
+        return self.response({"message": "Not Found"}, status=404)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def graphql(self, payload: dict):
+        query = payload["query"]
+        years = re.findall(r"(y\d{4}): user", query)
+        if years:
+            return self.response({"data": {
+                y: {"contributionsCollection": {"contributionCalendar": {
+                    "weeks": [{"contributionDays": synthetic_calendar(int(y[1:]))}]}}}
+                for y in years
+            }})
+        cursor = int((payload.get("variables") or {}).get("cursor") or 0)
+        nodes = [{"nameWithOwner": f"org-{i % 40}/project-{i}", "description": "upstream project",
+                  "stargazerCount": i * 3, "primaryLanguage": {"name": "Go"}}
+                 for i in range(cursor, min(cursor + 100, 250))]
+        contributed = {"totalCount": 250, "nodes": nodes,
+                       "pageInfo": {"hasNextPage": cursor + 100 < 250, "endCursor": str(cursor + 100)}}
+        user = {"repositoriesContributedTo": contributed}
+        if "contributionsCollection" in query:
+            days = synthetic_calendar(datetime.now(timezone.utc).year)
+            user["contributionsCollection"] = {
+                "totalCommitContributions": 900, "totalPullRequestContributions": 120,
+                "totalPullRequestReviewContributions": 80, "totalIssueContributions": 40,
+                "totalRepositoryContributions": 12,
+                "contributionCalendar": {"totalContributions": sum(d["contributionCount"] for d in days),
+                                         "weeks": [{"contributionDays": days}]},
+            }
+        return self.response({"data": {"user": user}})
+
+
+def record_fixture(repos: int, path: str):
+    """Run the real pipeline against SyntheticGitHub and save what it saw as a --replay fixture."""
+    session = ap.RecordingSession(SyntheticGitHub(repos))
+    client = ap.GitHubClient(None, concurrency=8, session=session)
+    args = ap.build_parser().parse_args(["-u", LOGIN, "--no-cache", "--no-checkpoint"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ap.REPORT_WRITERS["json"](os.path.join(os.path.dirname(path), "record.json")) as writer:
+            ap.analyse_profile(client, LOGIN, args, writer)
+    session.save(path)
+
+
+# ─── Measurements ────────────────────────────────────────────────────────────
+
+def measure(fn, repeat: int) -> tuple[float, float]:
+    """Best wall time over `repeat` calls, then the tracemalloc peak (MiB) of one more call."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2 ** 20
+
+
+def bench_size(repos: int, workdir: str, repeat: int, latency_ms: float) -> list[dict]:
+    rnd = random.Random(repos)
+    records = [ap.RepoRecord.from_api(synthetic_repo(i, rnd)) for i in range(repos)]
+    events = [synthetic_event(i, rnd, repos) for i in range(repos)]
+    user = SyntheticGitHub(repos).graphql({"query": "contributionsCollection"}).json()["data"]["user"]
+    user["contributionHistory"] = ap.ContributionHistory({
+        d["date"]: d["contributionCount"]
+        for year in range(int(CREATED_AT[:4]), datetime.now(timezone.utc).year + 1)
+        for d in synthetic_calendar(year)
+    })
+
+    fixture = os.path.join(workdir, f"fixture-{repos}.json")
+    if not os.path.exists(fixture):
+        record_fixture(repos, fixture)
+    output = os.path.join(workdir, f"out-{repos}.json")
+    argv = ["-u", LOGIN, "-o", output, "--replay", fixture, "--replay-latency", str(latency_ms)]
+
+    def pipeline():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ap.main(argv)
+
+    cases = [
+        ("analyse_repos", len(records), lambda: ap.analyse_repos(records, LOGIN)),
+        ("analyse_events", len(events), lambda: ap.analyse_events(events)),
+        ("analyse_contributions", len(user["contributionHistory"].counts), lambda: ap.analyse_contributions(user)),
+        ("main (replay)", repos, pipeline),
+    ]
+    results = []
+    for name, items, fn in cases:
+        seconds, peak = measure(fn, repeat)
+        results.append({"case": name, "size": repos, "items": items, "seconds": round(seconds, 4),
+                        "items_per_s": round(items / seconds), "peak_mib": round(peak, 2)})
+        print(f"  {name:<22} {repos:>7} {items:>8} {seconds:>9.3f} {items / seconds:>12,.0f} {peak:>9.1f}")
+    return results
+
+
+def regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Cases whose throughput dropped, or whose peak memory grew, by more than `tolerance`."""
+    before = {(r["case"], r["size"]): r for r in baseline}
+    found = []
+    for r in results:
+        old = before.get((r["case"], r["size"]))
+        if not old:
+            continue
+        if r["items_per_s"] < old["items_per_s"] * (1 - tolerance):
+            found.append(f"{r['case']} @{r['size']}: {old['items_per_s']:,} → {r['items_per_s']:,} items/s")
+        if r["peak_mib"] > old["peak_mib"] * (1 + tolerance) + 1:
+            found.append(f"{r['case']} @{r['size']}: peak {old['peak_mib']} → {r['peak_mib']} MiB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of analyse-profile.py over synthetic fixtures")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="synthetic account sizes (number of repos)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (the best one is kept)")
+    parser.add_argument("--latency", type=float, default=0, metavar="MS",
+                        help="simulated latency per replayed request for the main() case")
+    parser.add_argument("--fixtures", help="keep the recorded fixtures in this directory (default: a temp dir)")
+    parser.add_argument("--json", metavar="FILE", help="write the results here")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="--baseline: allowed throughput drop / peak-memory growth (0.25 = 25 %%)")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.fixtures or stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-profile-"))
+        os.makedirs(workdir, exist_ok=True)
+        print(f"  {'case':<22} {'repos':>7} {'items':>8} {'best s':>9} {'items/s':>12} {'peak MiB':>9}")
+        results = []
+        for size in args.sizes:
+            results.extend(bench_size(size, workdir, args.repeat, args.latency))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"date": datetime.now(timezone.utc).isoformat(), "numpy": ap.load_numpy() is not None,
+                       "results": results}, f, indent=2)
+        print(f"\n✓ Results saved to {args.json}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(results, json.load(f)["results"], args.tolerance)
+        for line in found:
+            print(f"✗ regression: {line}")
+        if found:
+            sys.exit(1)
+        print(f"✓ No regression beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()